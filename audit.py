@@ -0,0 +1,236 @@
+"""Journal d'audit des recommandations affichées
+
+Usage du lecteur :
+    python audit.py [audit/decisions.jsonl.gz] [--top 10]
+affiche le nombre de recommandations enregistrées par recommandation, par chemin
+et par jour, toutes rotations confondues.
+
+Les événements sont mis en file en mémoire (record ne touche jamais le disque)
+puis écrits par lots par un thread d'arrière-plan. Chaque lot est un membre
+gzip ajouté en fin de fichier : le fichier reste en ajout seul, compact, et
+lisible d'un bloc par gzip. Au-delà de max_bytes, le fichier est renommé
+(.1 le plus récent, .2, ...) et un nouveau fichier commence. Aucune rotation
+n'est supprimée par défaut : toute recommandation affichée doit rester
+enregistrée. Une durée de conservation ne s'applique que si elle est configurée
+explicitement (backups, ou TOGOATB_AUDIT_BACKUPS) : seules les backups
+rotations les plus récentes sont alors gardées, les plus anciennes supprimées.
+Les événements en attente sont écrits à l'arrêt normal du processus (atexit).
+"""
+import argparse
+import atexit
+import gzip
+import json
+import os
+import threading
+import time
+import zlib
+from collections import Counter
+from pathlib import Path
+
+AUDIT_PATH = Path(os.environ.get(
+    "TOGOATB_AUDIT_FILE", Path(__file__).parent / "audit" / "decisions.jsonl.gz"))
+# Nombre de rotations conservées ; non défini : toutes (aucune suppression)
+AUDIT_BACKUPS = (int(os.environ["TOGOATB_AUDIT_BACKUPS"])
+                 if os.environ.get("TOGOATB_AUDIT_BACKUPS") else None)
+
+
+class AuditLog:
+    """File d'événements d'audit vidée par lots dans un fichier gzip en ajout seul"""
+
+    def __init__(self, path=AUDIT_PATH, batch_size=256, flush_interval=2.0,
+                 max_bytes=16 * 1024 * 1024, backups=AUDIT_BACKUPS, fsync=True):
+        self.path = Path(path)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.fsync = fsync
+        self.pending = []
+        self.written = 0
+        self.batches = 0
+        self.failures = 0
+        self._closed = False
+        self._condition = threading.Condition()
+        self._write_lock = threading.Lock()
+        self._thread = threading.Thread(target=self._run, name="audit-writer", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def record(self, guideline, path, recommendation, references, session=None):
+        """Met en file l'affichage d'une recommandation (sans accès disque)"""
+        event = {
+            "ts": round(time.time(), 3),
+            "guideline": guideline.id,
+            "hash": guideline.source_hash[:16],
+            "path": [step["answer"] for step in path],
+            "recommendation": recommendation,
+            "references": list(references)
+        }
+        if session is not None:
+            event["session"] = session
+        with self._condition:
+            self.pending.append(event)
+            if len(self.pending) >= self.batch_size:
+                self._condition.notify()
+
+    def _run(self):
+        while True:
+            with self._condition:
+                self._condition.wait_for(
+                    lambda: self._closed or len(self.pending) >= self.batch_size,
+                    timeout=self.flush_interval)
+                batch, self.pending = self.pending, []
+                closed = self._closed
+            if batch:
+                self._write(batch)
+            if closed:
+                return
+
+    def _write(self, batch):
+        lines = "".join(json.dumps(event, ensure_ascii=False, separators=(",", ":")) + "\n"
+                        for event in batch)
+        data = gzip.compress(lines.encode("utf-8"))
+        with self._write_lock:
+            try:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                if self.path.exists() and self.path.stat().st_size + len(data) > self.max_bytes:
+                    self._rotate()
+                with open(self.path, "ab") as handle:
+                    handle.write(data)
+                    handle.flush()
+                    if self.fsync:
+                        os.fsync(handle.fileno())
+            except OSError:
+                # Échec d'écriture : le lot est remis en tête de file pour le prochain essai
+                self.failures += 1
+                with self._condition:
+                    self.pending[:0] = batch
+                return
+            self.written += len(batch)
+            self.batches += 1
+
+    def _rotate(self):
+        # Rotations existantes .1 à .last, décalées d'un cran : .last → .last+1, ..., courant → .1
+        last = 0
+        while rotated_path(self.path, last + 1).exists():
+            last += 1
+        if self.backups is not None:
+            # Conservation configurée explicitement : les plus anciennes sont supprimées
+            while last >= self.backups:
+                rotated_path(self.path, last).unlink()
+                last -= 1
+        for index in range(last, -1, -1):
+            os.replace(rotated_path(self.path, index), rotated_path(self.path, index + 1))
+
+    def flush(self):
+        """Écrit immédiatement les événements en attente"""
+        with self._condition:
+            batch, self.pending = self.pending, []
+        if batch:
+            self._write(batch)
+
+    def close(self):
+        """Écrit les derniers événements et arrête le thread (appelé à l'arrêt du processus)"""
+        with self._condition:
+            if self._closed:
+                return
+            self._closed = True
+            self._condition.notify()
+        self._thread.join()
+
+    def stats(self):
+        return {"pending": len(self.pending), "written": self.written,
+                "batches": self.batches, "failures": self.failures}
+
+
+def rotated_path(path, index):
+    """Chemin de la rotation index (0 : fichier courant)"""
+    path = Path(path)
+    return path if index == 0 else path.with_name(f"{path.name}.{index}")
+
+
+def read_events(path=AUDIT_PATH):
+    """Génère les événements de toutes les rotations, du plus ancien au plus récent"""
+    path = Path(path)
+    index = 1
+    while rotated_path(path, index).exists():
+        index += 1
+    for i in range(index - 1, -1, -1):
+        try:
+            handle = gzip.open(rotated_path(path, i), "rt", encoding="utf-8")
+        except OSError:
+            continue
+        with handle:
+            try:
+                for line in handle:
+                    try:
+                        yield json.loads(line)
+                    except ValueError:
+                        continue
+            except (OSError, EOFError, zlib.error):
+                # Dernier lot tronqué (arrêt brutal) : les lots précédents restent lisibles
+                continue
+
+
+def aggregate_audit(path=AUDIT_PATH, top=10):
+    """Nombre d'affichages par recommandation, par chemin, par fichier de recommandation et par jour"""
+    recommendations = Counter()
+    paths = Counter()
+    guidelines = Counter()
+    days = Counter()
+    total = 0
+    for event in read_events(path):
+        total += 1
+        recommendations[event["recommendation"]] += 1
+        paths[" → ".join(event["path"])] += 1
+        guidelines[event["guideline"]] += 1
+        days[time.strftime("%Y-%m-%d", time.localtime(event["ts"]))] += 1
+    return {
+        "events": total,
+        "guidelines": dict(guidelines),
+        "recommendations": recommendations.most_common(top),
+        "paths": paths.most_common(top),
+        "days": dict(sorted(days.items()))
+    }
+
+
+# Journal partagé par toutes les sessions du processus, créé au premier usage
+_audit_log = None
+_lock = threading.Lock()
+
+
+def get_audit_log():
+    global _audit_log
+    with _lock:
+        if _audit_log is None:
+            _audit_log = AuditLog()
+        return _audit_log
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Synthèse du journal d'audit des recommandations")
+    parser.add_argument("path", nargs="?", default=str(AUDIT_PATH))
+    parser.add_argument("--top", type=int, default=10)
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args(argv)
+
+    report = aggregate_audit(args.path, args.top)
+    if args.json:
+        print(json.dumps(report, ensure_ascii=False, indent=2))
+        return
+    print(f"{report['events']} recommandations affichées")
+    for guideline, count in report["guidelines"].items():
+        print(f"  {guideline} : {count}")
+    print("Recommandations les plus affichées :")
+    for recommendation, count in report["recommendations"]:
+        print(f"  {count:>7}  {recommendation}")
+    print("Chemins les plus parcourus :")
+    for path, count in report["paths"]:
+        print(f"  {count:>7}  {path}")
+    print("Par jour :")
+    for day, count in report["days"].items():
+        print(f"  {day}  {count}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+"""Évaluation par lots de cas historiques (JSONL) avec l'arbre décisionnel
+
+Usage :
+    python batch_eval.py cas.jsonl -o resultats.jsonl [--workers 4] [--chunk-size 2000]
+
+Chaque ligne d'entrée est soit un objet {"id": ..., "answers": {clé: réponse}},
+soit directement l'objet {clé: réponse}. Chaque ligne de sortie reprend l'id (ou
+le numéro de ligne) avec le statut, la recommandation, les références et le
+chemin parcouru. Les lignes sont lues et écrites par blocs ; avec --workers, les
+blocs sont répartis sur un pool de processus avec un nombre borné de blocs en
+vol, la mémoire reste donc constante quelle que soit la taille du fichier.
+"""
+import argparse
+import json
+import sys
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from pathlib import Path
+
+from decision_engine import DecisionTable
+from guidelines import load_guideline
+
+DEFAULT_GUIDELINE = Path(__file__).parent / "guidelines" / "infections_urinaires.json"
+
+# Table de décision du processus courant (posée par _init_worker dans les workers)
+_table = None
+
+
+def _init_worker(table):
+    global _table
+    _table = table
+
+
+def evaluate_line(table, line, line_number):
+    """Évalue une ligne JSONL et retourne l'enregistrement de sortie"""
+    try:
+        record = json.loads(line)
+    except ValueError as exc:
+        return {"id": line_number, "status": "invalide", "error": f"JSON invalide : {exc}"}
+    if not isinstance(record, dict):
+        return {"id": line_number, "status": "invalide", "error": "Un cas doit être un objet"}
+
+    if isinstance(record.get("answers"), dict):
+        case = record["answers"]
+        result = {"id": record.get("id", line_number)}
+    else:
+        case = record
+        result = {"id": line_number}
+    result.update(table.evaluate(case))
+    return result
+
+
+def evaluate_chunk(lines, first_line_number, table=None):
+    """Évalue un bloc de lignes et retourne le texte JSONL correspondant"""
+    table = table or _table
+    output = []
+    for offset, line in enumerate(lines):
+        if not line.strip():
+            continue
+        result = evaluate_line(table, line, first_line_number + offset)
+        output.append(json.dumps(result, ensure_ascii=False))
+    return "\n".join(output) + "\n" if output else ""
+
+
+def read_chunks(stream, chunk_size):
+    """Découpe un flux de lignes en blocs (liste de lignes, numéro de la première)"""
+    line_number = 1
+    while True:
+        chunk = list(islice(stream, chunk_size))
+        if not chunk:
+            return
+        yield chunk, line_number
+        line_number += len(chunk)
+
+
+def run_batch(source, destination, table, workers=0, chunk_size=2000):
+    """Évalue tous les cas de source et écrit les résultats dans destination
+
+    Retourne le nombre de lignes lues.
+    """
+    total = 0
+    if workers <= 1:
+        for chunk, first in read_chunks(source, chunk_size):
+            destination.write(evaluate_chunk(chunk, first, table))
+            total += len(chunk)
+        return total
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(table,)) as pool:
+        # Fenêtre bornée de blocs en cours : l'ordre de sortie est conservé
+        # et l'entrée n'est lue qu'au rythme du traitement
+        pending = deque()
+        for chunk, first in read_chunks(source, chunk_size):
+            pending.append(pool.submit(evaluate_chunk, chunk, first))
+            total += len(chunk)
+            if len(pending) >= workers * 2:
+                destination.write(pending.popleft().result())
+        while pending:
+            destination.write(pending.popleft().result())
+    return total
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Évalue un fichier JSONL de cas avec l'arbre décisionnel")
+    parser.add_argument("cases", help="fichier JSONL des cas ('-' pour l'entrée standard)")
+    parser.add_argument("-o", "--output", default="-",
+                        help="fichier JSONL des résultats ('-' pour la sortie standard)")
+    parser.add_argument("--guideline", default=str(DEFAULT_GUIDELINE),
+                        help="fichier de recommandation (JSON/YAML)")
+    parser.add_argument("--workers", type=int, default=0,
+                        help="nombre de processus (0 : dans le processus courant)")
+    parser.add_argument("--chunk-size", type=int, default=2000,
+                        help="nombre de lignes par bloc")
+    args = parser.parse_args(argv)
+
+    table = DecisionTable(load_guideline(args.guideline).tree)
+    source = sys.stdin if args.cases == "-" else open(args.cases, encoding="utf-8")
+    destination = sys.stdout if args.output == "-" else open(
+        args.output, "w", encoding="utf-8")
+    try:
+        total = run_batch(source, destination, table,
+                          workers=args.workers, chunk_size=args.chunk_size)
+    finally:
+        if source is not sys.stdin:
+            source.close()
+        if destination is not sys.stdout:
+            destination.close()
+    print(f"{total} cas évalués", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
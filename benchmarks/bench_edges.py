@@ -0,0 +1,60 @@
+"""Benchmark du rendu des arêtes : une trace par arête contre traces groupées
+
+Usage : python -m benchmarks.bench_edges [--repeat N]
+
+Le temps de rendu navigateur ne peut pas être mesuré sans navigateur ; on mesure
+ici ce qui en est le moteur côté serveur : construction de la figure, temps de
+sérialisation JSON et taille de la charge envoyée au client. L'arbre est rendu
+en entier (lod_threshold=None) : sans cela, les grands arbres seraient mesurés
+dans leur vue réduite.
+"""
+import argparse
+import statistics
+import time
+
+from benchmarks.synthetic import count_nodes, make_synthetic_path, make_synthetic_tree
+from tree_visualization import create_decision_tree_visualization
+from tree_layout import compile_tree
+
+SHAPES = [(3, 2), (4, 3), (5, 3), (6, 3), (5, 4)]
+
+
+def measure(tree, path, batch_edges, repeat):
+    """Retourne (nb de traces, octets JSON, ms construction, ms sérialisation)"""
+    build_times, json_times = [], []
+    payload = ""
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fig = create_decision_tree_visualization(
+            tree, path, batch_edges=batch_edges, lod_threshold=None)
+        built = time.perf_counter()
+        payload = fig.to_json()
+        done = time.perf_counter()
+        build_times.append((built - start) * 1000)
+        json_times.append((done - built) * 1000)
+    return (len(fig.data), len(payload.encode("utf-8")),
+            statistics.median(build_times), statistics.median(json_times))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    header = f"{'profondeur x arité':>18} {'nœuds':>6} | {'mode':>8} {'traces':>7} {'JSON (ko)':>10} {'figure (ms)':>12} {'to_json (ms)':>13}"
+    print(header)
+    print("-" * len(header))
+    for depth, fanout in SHAPES:
+        source = make_synthetic_tree(depth, fanout)
+        tree = compile_tree(source)
+        path = make_synthetic_path(source)
+        for batch_edges in (False, True):
+            traces, size, build_ms, json_ms = measure(
+                tree, path, batch_edges, args.repeat)
+            mode = "groupé" if batch_edges else "par arête"
+            print(f"{f'{depth} x {fanout}':>18} {count_nodes(source):>6} | {mode:>8} "
+                  f"{traces:>7} {size / 1024:>10.1f} {build_ms:>12.1f} {json_ms:>13.1f}")
+
+
+if __name__ == "__main__":
+    main()
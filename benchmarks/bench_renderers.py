@@ -0,0 +1,84 @@
+"""Benchmark des rendus : figure Plotly contre SVG côté serveur
+
+Usage : python -m benchmarks.bench_renderers [--repeat N]
+
+Pour les chemins de la recommandation fournie et des arbres synthétiques
+(réduits par collapse_tree au-delà de LOD_THRESHOLD), mesure le temps de
+construction (Plotly : figure puis JSON ; SVG : texte) et la charge envoyée au
+client, brute et compressée gzip. Côté Plotly s'ajoute, une fois par client,
+le bundle plotly.js (taille du fichier fourni par le paquet plotly).
+"""
+import argparse
+import gzip
+import statistics
+import time
+from pathlib import Path
+
+import plotly
+
+from benchmarks.synthetic import count_nodes, make_synthetic_path, make_synthetic_tree
+from decision_engine import iter_leaf_paths
+from guidelines import load_guideline
+from tree_layout import compile_tree, filter_path_for_tree
+from tree_svg import create_decision_tree_svg
+from tree_visualization import create_decision_tree_visualization
+
+GUIDELINE = Path(__file__).parent.parent / "guidelines" / "infections_urinaires.json"
+SHAPES = [(4, 3), (5, 4), (6, 4)]
+
+
+def measure(cases, repeat):
+    """(ms Plotly, octets, octets gzip, ms SVG, octets, octets gzip), médianes sur les cas"""
+    rows = []
+    for layout, path in cases:
+        plotly_times, svg_times = [], []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            payload = create_decision_tree_visualization(layout, path).to_json().encode("utf-8")
+            plotly_times.append((time.perf_counter() - start) * 1000)
+            start = time.perf_counter()
+            svg = create_decision_tree_svg(layout, path).encode("utf-8")
+            svg_times.append((time.perf_counter() - start) * 1000)
+        rows.append((statistics.median(plotly_times), len(payload), len(gzip.compress(payload)),
+                     statistics.median(svg_times), len(svg), len(gzip.compress(svg))))
+    return [statistics.median(column) for column in zip(*rows)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--guideline", default=str(GUIDELINE))
+    args = parser.parse_args()
+
+    # Rendu d'échauffement non mesuré (chargement paresseux des validateurs Plotly)
+    warmup = compile_tree(make_synthetic_tree(2, 2))
+    create_decision_tree_visualization(warmup, []).to_json()
+
+    guideline = load_guideline(args.guideline)
+    suites = [(f"{guideline.id} ({sum(1 for _ in iter_leaf_paths(guideline.tree))} chemins)", [
+        (guideline.situations[path[0]["answer"]].layout,
+         filter_path_for_tree(path, path[0]["answer"]))
+        for path in iter_leaf_paths(guideline.tree)])]
+    for depth, fanout in SHAPES:
+        tree = make_synthetic_tree(depth, fanout)
+        suites.append((f"{depth} x {fanout} ({count_nodes(tree)} nœuds)",
+                       [(compile_tree(tree), make_synthetic_path(tree, [fanout - 1] * depth))]))
+
+    header = (f"{'arbre':>30} | {'Plotly ms':>9} {'JSON Kio':>9} {'gzip Kio':>9} | "
+              f"{'SVG ms':>7} {'SVG Kio':>8} {'gzip Kio':>9}")
+    print(header)
+    print("-" * len(header))
+    for name, cases in suites:
+        plotly_ms, json_bytes, json_gzip, svg_ms, svg_bytes, svg_gzip = measure(cases, args.repeat)
+        print(f"{name:>30} | {plotly_ms:>9.1f} {json_bytes / 1024:>9.1f} {json_gzip / 1024:>9.1f} | "
+              f"{svg_ms:>7.2f} {svg_bytes / 1024:>8.1f} {svg_gzip / 1024:>9.1f}")
+
+    bundle = Path(plotly.__file__).parent / "package_data" / "plotly.min.js"
+    if bundle.exists():
+        data = bundle.read_bytes()
+        print(f"\nbundle plotly.js (une fois par client) : {len(data) / 1024:.0f} Kio, "
+              f"{len(gzip.compress(data)) / 1024:.0f} Kio gzip")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""Benchmark du stockage des nœuds : listes de dictionnaires contre arbre compilé en colonnes
+
+Usage : python -m benchmarks.bench_storage [--repeat N]
+
+Mémoire : octets alloués (tracemalloc) par nœud pour la sortie de
+build_tree_structure (un dictionnaire par nœud et par arête) et pour l'arbre
+compilé (colonnes, adjacence comprise), une fois les intermédiaires libérés.
+Parcours : coût par nœud d'une passe lisant type, x et y, par dictionnaires,
+par les vues tree.nodes et directement sur les colonnes.
+"""
+import argparse
+import gc
+import statistics
+import time
+import tracemalloc
+
+from benchmarks.synthetic import count_nodes, make_synthetic_tree
+from compiled_tree import CompiledTree, TYPE_CODES
+from tree_layout import build_tree_structure
+
+SHAPES = [(5, 3), (6, 4), (8, 3), (7, 5)]
+
+
+def allocated(factory):
+    """Octets retenus par le résultat de factory()"""
+    gc.collect()
+    tracemalloc.start()
+    result = factory()
+    gc.collect()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return result, size
+
+
+def build_dicts(source):
+    tree_data = {"nodes": [], "edges": []}
+    build_tree_structure(source, tree_data=tree_data, branch_width=10)
+    return tree_data
+
+
+def timed(function, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    header = (f"{'profondeur x arité':>18} {'nœuds':>8} | {'dict (o/nœud)':>14} "
+              f"{'colonnes (o/nœud)':>18} | {'dict (ns/nœud)':>15} {'vues (ns/nœud)':>15} "
+              f"{'colonnes (ns/nœud)':>19}")
+    print(header)
+    print("-" * len(header))
+    option = TYPE_CODES["option"]
+    for depth, fanout in SHAPES:
+        source = make_synthetic_tree(depth, fanout)
+        count = count_nodes(source)
+        tree_data, dict_bytes = allocated(lambda: build_dicts(source))
+        tree, compact_bytes = allocated(lambda: CompiledTree(build_dicts(source)))
+
+        def scan_dicts():
+            return sum(n["x"] + n["y"] for n in tree_data["nodes"] if n["type"] == "option")
+
+        def scan_views():
+            return sum(n["x"] + n["y"] for n in tree.nodes if n["type"] == "option")
+
+        def scan_columns():
+            xs, ys = tree.x, tree.y
+            return sum(xs[i] + ys[i] for i, code in enumerate(tree.kinds) if code == option)
+
+        per_node = [timed(scan, args.repeat) / count * 1e9
+                    for scan in (scan_dicts, scan_views, scan_columns)]
+        print(f"{f'{depth} x {fanout}':>18} {count:>8} | {dict_bytes / count:>14.0f} "
+              f"{compact_bytes / count:>18.0f} | {per_node[0]:>15.0f} {per_node[1]:>15.0f} "
+              f"{per_node[2]:>19.0f}")
+        del tree_data, tree
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,299 @@
+"""Test de charge de l'application Streamlit : sessions simultanées simulées
+
+Usage :
+    python -m benchmarks.load [--sessions 50] [--concurrency 50] [--paths 5]
+                              [--cases cas.jsonl] [--think 0] [--seed 0]
+                              [--output resultats.json]
+                              [--save-baseline benchmarks/load_baseline.json]
+                              [--baseline benchmarks/load_baseline.json --tolerance 0.25]
+
+Chaque session est une instance d'AppTest (API de test de Streamlit, sans
+navigateur ni réseau) pilotée par son propre thread et qui exécute main.py dans
+ce processus, comme le serveur Streamlit : les caches de module
+(recommandations, mises en page, figures) sont partagés entre les sessions.
+AppTest remplace le Runtime global de Streamlit le temps d'un rerun : les
+reruns passent donc un par un (verrou), ce qui correspond à un serveur dont le
+script, limité par le CPU, est sérialisé par le GIL. La latence d'un rerun
+inclut l'attente de ce verrou (file d'attente du serveur) ; le temps de service
+seul est relevé à part. Une session ouvre l'application puis parcourt --paths chemins,
+tirés au hasard parmi les chemins de l'arbre ou lus dans --cases (JSONL : liste
+de réponses, ou {"answers": {clé: réponse}} comme batch_eval.py), en cliquant
+une réponse par rerun. Sont relevés la latence de chaque rerun (percentiles),
+le débit en reruns par seconde et la croissance de la mémoire résidente par
+session encore ouverte. Le journal d'audit et les compteurs d'usage sont
+redirigés vers un répertoire temporaire.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+APP = Path(__file__).parent.parent / "main.py"
+METRICS = ("p50_ms", "p95_ms", "p99_ms", "kib_per_session")
+
+# Un seul rerun AppTest à la fois dans le processus (Runtime global, voir plus haut)
+_run_lock = threading.Lock()
+
+
+def rss_kib():
+    """Mémoire résidente courante du processus (Linux : /proc/self/statm)"""
+    with open("/proc/self/statm") as handle:
+        pages = int(handle.read().split()[1])
+    return pages * os.sysconf("SC_PAGE_SIZE") // 1024
+
+
+def answers_to_path(decision_tree, answers):
+    """Réponses successives d'un cas {clé: réponse}, jusqu'à une recommandation (None si incomplet)"""
+    node, path = decision_tree, []
+    while node is not None:
+        answer = answers.get(node["key"])
+        option = next((o for o in node["options"] if o["value"] == answer), None)
+        if option is None:
+            return None
+        path.append(answer)
+        node = option.get("next")
+    return path
+
+
+def app_guideline():
+    """Recommandation ouverte par défaut par l'application (celle que parcourent les sessions)"""
+    from guidelines import get_registry
+    from main import DEFAULT_GUIDELINE
+
+    registry = get_registry()
+    names = registry.names()
+    return registry.get(DEFAULT_GUIDELINE if DEFAULT_GUIDELINE in names else names[0])
+
+
+def load_cases(filename, decision_tree):
+    """Chemins scriptés (listes de réponses) lus dans un fichier JSONL"""
+    paths = []
+    with open(filename, encoding="utf-8") as handle:
+        for line in handle:
+            if not line.strip():
+                continue
+            case = json.loads(line)
+            if isinstance(case, dict):
+                case = answers_to_path(decision_tree, case.get("answers", case))
+            if case:
+                paths.append(case)
+    return paths
+
+
+def percentile(ordered, fraction):
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def summarize(timings):
+    """Percentiles (ms) d'une liste de durées en secondes"""
+    if not timings:
+        return {"count": 0}
+    ordered = sorted(t * 1000 for t in timings)
+    return {
+        "count": len(ordered),
+        "p50_ms": round(statistics.median(ordered), 2),
+        "p90_ms": round(percentile(ordered, 0.90), 2),
+        "p95_ms": round(percentile(ordered, 0.95), 2),
+        "p99_ms": round(percentile(ordered, 0.99), 2),
+        "max_ms": round(ordered[-1], 2)
+    }
+
+
+def run_session(paths, think, timeout):
+    """Une session : ouverture puis un clic par réponse ; retourne (AppTest, durées, erreurs)"""
+    from streamlit.testing.v1 import AppTest
+
+    timings = {"open": [], "answer": [], "service": []}
+    errors = []
+    at = AppTest.from_file(str(APP), default_timeout=timeout)
+
+    def rerun(kind, action):
+        start = time.perf_counter()
+        with _run_lock:
+            served = time.perf_counter()
+            action()
+            done = time.perf_counter()
+        timings[kind].append(done - start)
+        timings["service"].append(done - served)
+        if at.exception:
+            errors.append(str(at.exception[0].value))
+
+    rerun("open", at.run)
+    for answers in paths:
+        for depth, answer in enumerate(answers):
+            if depth >= len(at.radio):
+                errors.append(f"question {depth + 1} absente pour {answers}")
+                break
+            radio = at.radio[depth]
+            if radio.value == answer:
+                continue  # déjà sélectionnée : pas de clic, pas de rerun
+            if think:
+                time.sleep(think)
+            rerun("answer", radio.set_value(answer).run)
+    return at, timings, errors
+
+
+def run_load(sessions, concurrency, paths_per_session, cases=None, think=0.0, seed=0,
+             timeout=60):
+    """Lance les sessions (concurrency à la fois) et retourne le rapport de charge"""
+    from decision_engine import iter_leaf_paths
+
+    rng = random.Random(seed)
+    if not cases:
+        cases = [[step["answer"] for step in path]
+                 for path in iter_leaf_paths(app_guideline().tree)]
+    scripts = [[rng.choice(cases) for _ in range(paths_per_session)] for _ in range(sessions)]
+
+    # Session d'échauffement : imports, compilation, premiers rendus (hors mesures)
+    warmup, _, warmup_errors = run_session(scripts[0][:1], 0, timeout)
+    if warmup_errors:
+        raise RuntimeError(f"échec de la session d'échauffement : {warmup_errors[0]}")
+    del warmup
+    rss_before = rss_kib()
+
+    # Les sessions restent ouvertes jusqu'à la fin (état de session conservé,
+    # comme des onglets ouverts) : la mémoire mesurée inclut leur état
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        futures = [pool.submit(run_session, script, think, timeout) for script in scripts]
+        results = [future.result() for future in futures]
+    elapsed = time.perf_counter() - started
+    rss_after = rss_kib()
+
+    timings = {"open": [], "answer": [], "service": []}
+    errors = []
+    for _, session_timings, session_errors in results:
+        for kind, values in session_timings.items():
+            timings[kind].extend(values)
+        errors.extend(session_errors)
+    reruns = len(timings["service"])
+    report = {
+        "sessions": sessions,
+        "concurrency": concurrency,
+        "paths_per_session": paths_per_session,
+        "think_s": think,
+        "reruns": reruns,
+        "seconds": round(elapsed, 3),
+        "reruns_per_second": round(reruns / elapsed, 2) if elapsed else None,
+        "latency": summarize(timings["open"] + timings["answer"]),
+        "latency_open": summarize(timings["open"]),
+        "latency_answer": summarize(timings["answer"]),
+        "service": summarize(timings["service"]),
+        "rss_before_kib": rss_before,
+        "rss_after_kib": rss_after,
+        "kib_per_session": round((rss_after - rss_before) / sessions, 1),
+        "errors": len(errors),
+        "error_samples": errors[:5]
+    }
+    del results
+    return report
+
+
+def compare(report, baseline, tolerance):
+    """Régressions (latences, mémoire par session) par rapport à une référence"""
+    regressions = []
+    for metric in METRICS:
+        value = report.get(metric, report["latency"].get(metric))
+        before = baseline.get(metric, baseline.get("latency", {}).get(metric))
+        if before and value is not None and value > before * (1 + tolerance):
+            regressions.append({"metric": metric, "baseline": before, "value": value,
+                                "ratio": round(value / before, 3)})
+    return regressions
+
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=APP.parent,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sessions", type=int, default=50, help="nombre de sessions simulées")
+    parser.add_argument("--concurrency", type=int, default=50,
+                        help="sessions exécutées simultanément")
+    parser.add_argument("--paths", type=int, default=5, help="chemins parcourus par session")
+    parser.add_argument("--cases", help="chemins scriptés (JSONL) au lieu du tirage aléatoire")
+    parser.add_argument("--think", type=float, default=0.0,
+                        help="temps de réflexion avant chaque clic (secondes)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--timeout", type=float, default=60, help="délai maximal d'un rerun (s)")
+    parser.add_argument("--output", help="fichier JSON des résultats")
+    parser.add_argument("--baseline", help="résultats de référence à comparer")
+    parser.add_argument("--save-baseline", help="enregistre les résultats comme référence")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="dépassement relatif toléré (0.25 = +25 %%)")
+    args = parser.parse_args(argv)
+
+    # Effets de bord de l'application (audit, compteurs d'usage) hors du dépôt
+    scratch = tempfile.mkdtemp(prefix="togoatb-load-")
+    os.environ.setdefault("TOGOATB_AUDIT_FILE", os.path.join(scratch, "decisions.jsonl.gz"))
+    os.environ.setdefault("TOGOATB_PATH_STATS", os.path.join(scratch, "path_hits.json"))
+    sys.path.insert(0, str(APP.parent))
+
+    cases = load_cases(args.cases, app_guideline().tree) if args.cases else None
+    result = run_load(args.sessions, args.concurrency, args.paths, cases, args.think,
+                      args.seed, args.timeout)
+
+    latency = result["latency"]
+    print(f"{result['sessions']} sessions ({result['concurrency']} simultanées), "
+          f"{result['reruns']} reruns en {result['seconds']:.1f} s : "
+          f"{result['reruns_per_second']} reruns/s", file=sys.stderr)
+    for name in ("latency", "latency_open", "latency_answer", "service"):
+        stats = result[name]
+        if stats["count"]:
+            print(f"    {name:<16} p50 {stats['p50_ms']:>8.1f} ms  p95 {stats['p95_ms']:>8.1f} ms  "
+                  f"p99 {stats['p99_ms']:>8.1f} ms  max {stats['max_ms']:>8.1f} ms", file=sys.stderr)
+    print(f"    mémoire : {result['rss_before_kib'] / 1024:.0f} → "
+          f"{result['rss_after_kib'] / 1024:.0f} Mio, {result['kib_per_session']:.0f} Kio par session"
+          f" ; {result['errors']} erreur(s)", file=sys.stderr)
+
+    report = {
+        "meta": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "revision": git_revision(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "seed": args.seed
+        },
+        **result
+    }
+
+    status = 1 if result["errors"] else 0
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as handle:
+            baseline = json.load(handle)
+        parameters = ("sessions", "concurrency", "paths_per_session", "think_s")
+        if any(baseline.get(name) != result[name] for name in parameters):
+            print("attention : paramètres de charge différents de ceux de la référence",
+                  file=sys.stderr)
+        report["regressions"] = compare(result, baseline, args.tolerance)
+        for regression in report["regressions"]:
+            print(f"RÉGRESSION {regression['metric']} : {regression['baseline']} → "
+                  f"{regression['value']} (x{regression['ratio']})", file=sys.stderr)
+        status = status or (1 if report["regressions"] else 0)
+
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    for target in (args.output, args.save_baseline):
+        if target:
+            with open(target, "w", encoding="utf-8") as handle:
+                handle.write(text + "\n")
+    if not args.output:
+        print(text)
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
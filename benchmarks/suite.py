@@ -0,0 +1,212 @@
+"""Suite de benchmarks du pipeline mise en page → style → rendu sur arbres synthétiques
+
+Usage :
+    python -m benchmarks.suite [--shapes 4x3,6x3] [--label-length 40] [--repeat 5]
+                               [--output resultats.json]
+                               [--save-baseline benchmarks/baseline.json]
+                               [--baseline benchmarks/baseline.json --tolerance 0.25]
+
+Pour chaque forme (profondeur x arité), chaque étape est chronométrée (médiane
+et minimum sur --repeat exécutions) puis exécutée une fois sous tracemalloc pour
+son pic mémoire. Les étapes de figure suivent le chemin de l'application :
+base_figure construit la figure neutre, create_decision_tree_visualization la
+surcouche du chemin (figure neutre partagée, construite à sa première
+exécution) et figure_to_json sérialise cette figure, dont la taille JSON est
+aussi relevée. Avec --baseline,
+toute médiane, pic mémoire ou taille de figure dépassant la référence de plus de
+--tolerance est signalée et le code de sortie vaut 1.
+"""
+import argparse
+import json
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+
+from benchmarks.synthetic import count_nodes, make_synthetic_path, make_synthetic_tree
+from tree_visualization import BaseFigure, create_decision_tree_visualization, path_masks
+from tree_layout import (build_tree_structure, compile_tree, format_text_with_linebreaks, LABEL_WRAP,
+                         wrap_cache_clear)
+
+DEFAULT_SHAPES = "3x3,4x3,5x3,6x3,4x5"
+
+
+def stage_functions(source, path):
+    """Étapes du pipeline, chacune consommant la sortie des précédentes"""
+    state = {}
+
+    def build_structure():
+        tree_data = {"nodes": [], "edges": []}
+        build_tree_structure(source, tree_data=tree_data, branch_width=10)
+        return tree_data
+
+    def compile_layout():
+        state["tree"] = compile_tree(source)
+        return state["tree"]
+
+    def wrap_labels():
+        # Cache de découpage vidé : chaque exécution découpe réellement les libellés
+        wrap_cache_clear()
+        return [format_text_with_linebreaks(n["label"], *LABEL_WRAP[n["type"]])
+                for n in state["tree"].nodes]
+
+    def path_styling():
+        tree = state["tree"]
+        return path_masks(tree, tree.resolve_path(path))
+
+    def neutral_figure():
+        # Figure neutre complète (sans réduction ni WebGL), hors cache partagé
+        return BaseFigure(state["tree"])
+
+    def figure():
+        # Comme l'application : figure neutre partagée plus surcouche du chemin
+        state["figure"] = create_decision_tree_visualization(
+            state["tree"], path, lod_threshold=None, webgl_threshold=None)
+        return state["figure"]
+
+    def lod_figure():
+        return create_decision_tree_visualization(state["tree"], path, lod_threshold=0)
+
+    def serialize():
+        state["json"] = state["figure"].to_json()
+        return state["json"]
+
+    return state, [
+        ("build_tree_structure", build_structure),
+        ("compile_tree", compile_layout),
+        ("format_text_with_linebreaks", wrap_labels),
+        ("path_styling", path_styling),
+        ("base_figure", neutral_figure),
+        ("create_decision_tree_visualization", figure),
+        ("lod_figure", lod_figure),
+        ("figure_to_json", serialize),
+    ]
+
+
+def run_shape(depth, fanout, label_length, repeat):
+    """Mesure toutes les étapes pour une forme d'arbre"""
+    source = make_synthetic_tree(depth, fanout, label_length=label_length)
+    path = make_synthetic_path(source, [fanout - 1] * depth)
+    state, stages = stage_functions(source, path)
+
+    results = {}
+    for name, function in stages:
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            function()
+            timings.append((time.perf_counter() - start) * 1000)
+
+        tracemalloc.start()
+        function()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        results[name] = {
+            "median_ms": round(statistics.median(timings), 3),
+            "min_ms": round(min(timings), 3),
+            "peak_kib": round(peak / 1024, 1)
+        }
+
+    return {
+        "shape": f"{depth}x{fanout}",
+        "depth": depth,
+        "fanout": fanout,
+        "label_length": label_length,
+        "nodes": count_nodes(source),
+        "stages": results,
+        "figure_json_bytes": len(state["json"].encode("utf-8"))
+    }
+
+
+def compare(results, baseline, tolerance):
+    """Liste des régressions par rapport à une référence"""
+    reference = {r["shape"]: r for r in baseline.get("results", [])}
+    regressions = []
+    for result in results:
+        previous = reference.get(result["shape"])
+        if previous is None:
+            continue
+        checks = [("figure_json_bytes", result["figure_json_bytes"],
+                   previous.get("figure_json_bytes"))]
+        for stage, values in result["stages"].items():
+            before = previous["stages"].get(stage, {})
+            checks.append((f"{stage}.median_ms", values["median_ms"], before.get("median_ms")))
+            checks.append((f"{stage}.peak_kib", values["peak_kib"], before.get("peak_kib")))
+        for metric, value, before in checks:
+            if before and value > before * (1 + tolerance):
+                regressions.append({
+                    "shape": result["shape"],
+                    "metric": metric,
+                    "baseline": before,
+                    "value": value,
+                    "ratio": round(value / before, 3)
+                })
+    return regressions
+
+
+def parse_shapes(text):
+    shapes = []
+    for item in text.split(","):
+        depth, fanout = item.lower().split("x")
+        shapes.append((int(depth), int(fanout)))
+    return shapes
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--shapes", default=DEFAULT_SHAPES,
+                        help="formes profondeurxarité séparées par des virgules")
+    parser.add_argument("--label-length", type=int, default=40)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--output", help="fichier JSON des résultats")
+    parser.add_argument("--baseline", help="résultats de référence à comparer")
+    parser.add_argument("--save-baseline", help="enregistre les résultats comme référence")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="dépassement relatif toléré (0.25 = +25 %%)")
+    args = parser.parse_args(argv)
+
+    results = []
+    for depth, fanout in parse_shapes(args.shapes):
+        result = run_shape(depth, fanout, args.label_length, args.repeat)
+        results.append(result)
+        print(f"{result['shape']:>6} ({result['nodes']} nœuds, "
+              f"figure {result['figure_json_bytes'] / 1024:.1f} ko)", file=sys.stderr)
+        for stage, values in result["stages"].items():
+            print(f"    {stage:<36} {values['median_ms']:>10.2f} ms "
+                  f"{values['peak_kib']:>10.1f} Kio", file=sys.stderr)
+
+    report = {
+        "meta": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "repeat": args.repeat
+        },
+        "results": results
+    }
+
+    status = 0
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as handle:
+            baseline = json.load(handle)
+        report["regressions"] = compare(results, baseline, args.tolerance)
+        for regression in report["regressions"]:
+            print(f"RÉGRESSION {regression['shape']} {regression['metric']} : "
+                  f"{regression['baseline']} → {regression['value']} "
+                  f"(x{regression['ratio']})", file=sys.stderr)
+        status = 1 if report["regressions"] else 0
+
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    for target in (args.output, args.save_baseline):
+        if target:
+            with open(target, "w", encoding="utf-8") as handle:
+                handle.write(text + "\n")
+    if not args.output:
+        print(text)
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
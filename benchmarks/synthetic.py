@@ -0,0 +1,64 @@
+"""Génération d'arbres décisionnels synthétiques au format de decision_tree"""
+
+
+def make_synthetic_tree(depth, fanout, label_length=30, prefix="q"):
+    """Construit un arbre complet de profondeur et d'arité données"""
+    filler = " lorem ipsum dolor sit amet"
+
+    def label(text):
+        if len(text) >= label_length:
+            return text[:label_length]
+        padding = (filler * (label_length // len(filler) + 1))
+        return (text + padding)[:label_length]
+
+    def build(level, node_prefix):
+        options = []
+        for i in range(fanout):
+            option_prefix = f"{node_prefix}.{i}"
+            option = {"value": f"choix_{option_prefix}"}
+            if level + 1 < depth:
+                option["next"] = build(level + 1, option_prefix)
+            else:
+                option["recommendation"] = label(
+                    f"Traitement {option_prefix}")
+                option["references"] = [f"p.{level + i}"]
+            options.append(option)
+        return {
+            "question": label(f"Question {node_prefix} ?"),
+            "key": f"cle_{node_prefix}",
+            "options": options
+        }
+
+    return build(0, prefix)
+
+
+def make_synthetic_path(tree, choices=None):
+    """Construit un chemin utilisateur (format de display_node) jusqu'à une feuille
+
+    choices donne l'index d'option à chaque niveau (0 par défaut).
+    """
+    path = []
+    node = tree
+    while node is not None:
+        index = choices[len(path)] if choices and len(
+            path) < len(choices) else 0
+        option = node["options"][index]
+        path.append({
+            "question": node["question"],
+            "answer": option["value"],
+            "step": len(path) + 1
+        })
+        node = option.get("next")
+    return path
+
+
+def count_nodes(tree):
+    """Nombre de nœuds (questions, options, recommandations) dans tree_data"""
+    total = 1
+    for option in tree["options"]:
+        total += 1
+        if "next" in option:
+            total += count_nodes(option["next"])
+        else:
+            total += 1
+    return total
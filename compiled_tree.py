@@ -0,0 +1,264 @@
+"""Arbre compilé : index id → nœud, adjacence parent/enfants et numérotation
+
+Les nœuds sont stockés en colonnes (tableaux typés pour x, y, niveau, type,
+parent, profondeur, ordre et taille de sous-arbre ; identifiants et libellés internés ; arêtes en
+paires d'entiers) plutôt qu'en un dictionnaire par nœud. tree.nodes et
+tree.edges restent utilisables comme des listes de dictionnaires, en lecture
+seule : chaque élément est une vue sur les colonnes.
+"""
+import sys
+from array import array
+from collections.abc import Mapping, Sequence
+
+# Types de nœuds et leur code dans la colonne kinds
+NODE_TYPES = ("question", "option", "recommendation", "summary")
+TYPE_CODES = {name: code for code, name in enumerate(NODE_TYPES)}
+
+_BASE_FIELDS = ("id", "label", "type", "level", "x", "y")
+
+
+class PathHighlight:
+    """Identifiants exacts des nœuds, arêtes et de la recommandation finale du chemin
+
+    node_order et edge_order gardent l'ordre du chemin (tuples) : tout ce qui
+    est produit en les parcourant est identique d'un processus à l'autre. Les
+    ensembles nodes et edges ne servent qu'aux tests d'appartenance.
+    """
+
+    __slots__ = ("nodes", "edges", "final", "node_order", "edge_order")
+
+    def __init__(self, nodes=(), edges=(), final=None):
+        self.node_order = tuple(dict.fromkeys(nodes))
+        self.edge_order = tuple(dict.fromkeys(edges))
+        self.nodes = frozenset(self.node_order)
+        self.edges = frozenset(self.edge_order)
+        self.final = final
+
+    def __bool__(self):
+        return bool(self.nodes)
+
+
+class NodeView(Mapping):
+    """Vue dictionnaire en lecture seule d'un nœud de l'arbre compilé"""
+
+    __slots__ = ("_tree", "_position")
+
+    def __init__(self, tree, position):
+        self._tree = tree
+        self._position = position
+
+    def __getitem__(self, key):
+        tree, i = self._tree, self._position
+        if key == "x":
+            return tree.x[i]
+        if key == "y":
+            return tree.y[i]
+        if key == "id":
+            return tree.ids[i]
+        if key == "type":
+            return NODE_TYPES[tree.kinds[i]]
+        if key == "label":
+            return tree.texts[i]
+        if key == "level":
+            return tree.level[i]
+        extra = tree.extras.get(i)
+        if extra is None or key not in extra:
+            raise KeyError(key)
+        return extra[key]
+
+    def __iter__(self):
+        yield from _BASE_FIELDS
+        yield from self._tree.extras.get(self._position, ())
+
+    def __len__(self):
+        return len(_BASE_FIELDS) + len(self._tree.extras.get(self._position, ()))
+
+    def __repr__(self):
+        return f"NodeView({dict(self)!r})"
+
+
+class NodeList(Sequence):
+    """Séquence des vues de nœuds (tree.nodes)"""
+
+    __slots__ = ("_tree",)
+
+    def __init__(self, tree):
+        self._tree = tree
+
+    def __len__(self):
+        return len(self._tree.ids)
+
+    def __getitem__(self, position):
+        if isinstance(position, slice):
+            return [NodeView(self._tree, i) for i in range(len(self))[position]]
+        if position < 0:
+            position += len(self)
+        if not 0 <= position < len(self):
+            raise IndexError(position)
+        return NodeView(self._tree, position)
+
+
+class EdgeList(Sequence):
+    """Séquence des arêtes sous forme {"source": id, "target": id} (tree.edges)"""
+
+    __slots__ = ("_tree",)
+
+    def __init__(self, tree):
+        self._tree = tree
+
+    def __len__(self):
+        return len(self._tree.edge_source)
+
+    def __getitem__(self, position):
+        if isinstance(position, slice):
+            return [self[i] for i in range(len(self))[position]]
+        tree = self._tree
+        return {"source": tree.ids[tree.edge_source[position]],
+                "target": tree.ids[tree.edge_target[position]]}
+
+
+def _compact(value):
+    """Texte interné, liste de textes figée en tuple interné (partagé entre nœuds)"""
+    if isinstance(value, str):
+        return sys.intern(value)
+    if isinstance(value, list) and all(isinstance(item, str) for item in value):
+        return tuple(sys.intern(item) for item in value)
+    return value
+
+
+class CompiledTree:
+    """Version indexée et compacte de la sortie de build_tree_structure, construite une seule fois"""
+
+    def __init__(self, tree_data, labels=None):
+        nodes = tree_data["nodes"]
+        count = len(nodes)
+
+        # Colonnes des nœuds
+        self.ids = [sys.intern(node["id"]) for node in nodes]
+        self.texts = [sys.intern(node["label"]) for node in nodes]
+        self.kinds = array("B", (TYPE_CODES[node["type"]] for node in nodes))
+        self.level = array("d", (node["level"] for node in nodes))
+        self.x = array("d", (node["x"] for node in nodes))
+        self.y = array("d", (node["y"] for node in nodes))
+        # Champs propres à certains nœuds (recommandation complète, références...)
+        self.extras = {}
+        for i, node in enumerate(nodes):
+            if len(node) > len(_BASE_FIELDS):
+                self.extras[i] = {sys.intern(key): _compact(value) for key, value in node.items()
+                                  if key not in _BASE_FIELDS}
+        # Libellés déjà découpés pour l'affichage (None si non précalculés)
+        self.labels = [sys.intern(label) for label in labels] if labels is not None else None
+        # Bornes (x_min, x_max, y_min, y_max) posées par la mise en page tidy
+        self.bounds = None
+
+        # Index de hachage id → position dans la liste des nœuds
+        self.index = {node_id: i for i, node_id in enumerate(self.ids)}
+
+        # Adjacence (positions entières, -1 pour la racine) et arêtes en paires d'indices
+        self.parent = array("i", [-1]) * count
+        self.children = [[] for _ in range(count)]
+        self.edge_source = array("i")
+        self.edge_target = array("i")
+        for edge in tree_data["edges"]:
+            source = self.index[edge["source"]]
+            target = self.index[edge["target"]]
+            self.parent[target] = source
+            self.children[source].append(target)
+            self.edge_source.append(source)
+            self.edge_target.append(target)
+
+        # Racines (nœuds sans parent), relevées une fois
+        self.root_positions = array("i", (i for i in range(count) if self.parent[i] == -1))
+
+        # Profondeur (en nombre d'arêtes) et ordre préfixe de chaque nœud
+        self.depth = array("i", [0]) * count
+        self.order = array("i", [0]) * count
+        rank = 0
+        stack = self.root_positions[::-1].tolist()
+        while stack:
+            current = stack.pop()
+            self.order[current] = rank
+            rank += 1
+            for child in reversed(self.children[current]):
+                self.depth[child] = self.depth[current] + 1
+                stack.append(child)
+
+        # Ordre suffixe (enfants avant parents : inverse d'un préfixe qui visite
+        # les enfants de droite à gauche) et taille de chaque sous-arbre
+        mirrored = array("i")
+        stack = self.root_positions.tolist()
+        while stack:
+            current = stack.pop()
+            mirrored.append(current)
+            stack.extend(self.children[current])
+        self.postorder = mirrored[::-1]
+        self.size = array("i", [1]) * count
+        for current in self.postorder:
+            if self.parent[current] != -1:
+                self.size[self.parent[current]] += self.size[current]
+
+        self.nodes = NodeList(self)
+        self.edges = EdgeList(self)
+
+    def __len__(self):
+        return len(self.ids)
+
+    @property
+    def edge_pairs(self):
+        """Arêtes en paires (position source, position cible)"""
+        return list(zip(self.edge_source, self.edge_target))
+
+    def node(self, node_id):
+        """Retourne le nœud correspondant à un identifiant en O(1)"""
+        return self.nodes[self.index[node_id]]
+
+    def roots(self):
+        """Positions des nœuds sans parent"""
+        return self.root_positions.tolist()
+
+    def resolve_path(self, user_path):
+        """Convertit le chemin utilisateur en identifiants de nœuds et d'arêtes
+
+        Chaque étape désigne l'option choisie par son index (option_index, posé
+        par display_node) ; à défaut, l'option est retrouvée par sa valeur exacte
+        parmi les enfants de la question courante. Coût O(P).
+        """
+        if not user_path or not len(self):
+            return PathHighlight()
+
+        ids, kinds = self.ids, self.kinds
+        question = TYPE_CODES["question"]
+        recommendation = TYPE_CODES["recommendation"]
+        nodes, edges, final = [], [], None
+        current = self.roots()[0]
+        for step in user_path:
+            if kinds[current] != question:
+                break
+            options = self.children[current]
+            index = step.get("option_index")
+            if index is None or not 0 <= index < len(options):
+                index = next((k for k, child in enumerate(options)
+                              if self.texts[child] == step["answer"]), None)
+                if index is None:
+                    break
+            option = options[index]
+            nodes.append(ids[current])
+            nodes.append(ids[option])
+            edges.append((ids[current], ids[option]))
+
+            if not self.children[option]:
+                break
+            current = self.children[option][0]
+            edges.append((ids[option], ids[current]))
+            if kinds[current] == recommendation:
+                final = ids[current]
+                break
+
+        return PathHighlight(nodes, edges, final)
+
+
+def compile_tree_data(tree_data):
+    """Compile tree_data si nécessaire (un arbre déjà compilé est retourné tel quel)"""
+    if isinstance(tree_data, CompiledTree):
+        return tree_data
+    return CompiledTree(tree_data)
@@ -0,0 +1,266 @@
+"""API HTTP de décision (ASGI), à côté de l'interface Streamlit
+
+Routes :
+    POST /decide   {"answers": {clé: réponse}} ou {"cases": [{clé: réponse}, ...]}
+    GET  /metrics  latences (p50/p95/p99) et requêtes par seconde
+    GET  /health   recommandation chargée et son empreinte
+
+Usage :
+    python decision_api.py [--host 127.0.0.1] [--port 8000]
+ou avec n'importe quel serveur ASGI : uvicorn decision_api:app
+
+L'application ne dépend que de la bibliothèque standard ; le petit serveur
+HTTP/1.1 intégré (asyncio) suffit pour un usage local. Le traitement d'une
+requête (chargement de la recommandation, évaluation des cas) s'exécute dans un
+thread de travail : la boucle d'événements continue de servir les autres
+connexions. Une recommandation invalide donne une erreur 422 en JSON.
+"""
+import argparse
+import asyncio
+import json
+import os
+import threading
+import time
+from collections import deque
+from pathlib import Path
+
+from decision_engine import DecisionTable
+from guidelines import GuidelineError, load_guideline
+
+GUIDELINE_PATH = Path(os.environ.get(
+    "TOGOATB_GUIDELINE", Path(__file__).parent / "guidelines" / "infections_urinaires.json"))
+
+# Nombre maximal de cas par requête groupée
+MAX_BULK_CASES = 10000
+
+
+class Metrics:
+    """Latences des dernières requêtes et débit, par fenêtre glissante"""
+
+    def __init__(self, window=2048):
+        self.started = time.monotonic()
+        self.requests = 0
+        self.errors = 0
+        self.cases = 0
+        self._latencies = deque(maxlen=window)
+        self._timestamps = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, latency, status, cases=0):
+        with self._lock:
+            self.requests += 1
+            self.cases += cases
+            if status >= 400:
+                self.errors += 1
+            self._latencies.append(latency)
+            self._timestamps.append(time.monotonic())
+
+    def snapshot(self):
+        """Compteurs, percentiles de latence (ms) et débit récent"""
+        with self._lock:
+            latencies = sorted(self._latencies)
+            timestamps = list(self._timestamps)
+            requests, errors, cases = self.requests, self.errors, self.cases
+
+        def percentile(q):
+            if not latencies:
+                return 0.0
+            return latencies[min(len(latencies) - 1, int(q * len(latencies)))] * 1000
+
+        now = time.monotonic()
+        recent = [t for t in timestamps if now - t <= 60]
+        span = min(60.0, now - recent[0]) if recent else 0.0
+        return {
+            "requests": requests,
+            "errors": errors,
+            "cases": cases,
+            "uptime_s": round(now - self.started, 3),
+            "latency_ms": {"p50": round(percentile(0.50), 3),
+                           "p95": round(percentile(0.95), 3),
+                           "p99": round(percentile(0.99), 3)},
+            "qps_60s": round(len(recent) / span, 2) if span > 0 else float(len(recent))
+        }
+
+
+metrics = Metrics()
+
+# Table de décision partagée, reconstruite seulement si la recommandation change
+_shared = {"hash": None, "table": None, "guideline": None}
+_shared_lock = threading.Lock()
+
+
+def get_table():
+    """Table de décision en mémoire, commune à toutes les requêtes du processus"""
+    guideline = load_guideline(GUIDELINE_PATH)
+    with _shared_lock:
+        if _shared["hash"] != guideline.source_hash:
+            _shared.update(hash=guideline.source_hash, guideline=guideline,
+                           table=DecisionTable(guideline.tree))
+        return _shared["table"]
+
+
+def decide(payload):
+    """Traite le corps d'une requête /decide ; retourne (statut HTTP, réponse, nb de cas)"""
+    if not isinstance(payload, dict):
+        return 400, {"error": "Le corps doit être un objet JSON"}, 0
+    table = get_table()
+
+    if "cases" in payload:
+        cases = payload["cases"]
+        if not isinstance(cases, list) or not all(isinstance(c, dict) for c in cases):
+            return 400, {"error": "'cases' doit être une liste d'objets"}, 0
+        if len(cases) > MAX_BULK_CASES:
+            return 413, {"error": f"Au plus {MAX_BULK_CASES} cas par requête"}, 0
+        return 200, {"results": [table.evaluate(case) for case in cases]}, len(cases)
+
+    answers = payload.get("answers")
+    if not isinstance(answers, dict):
+        return 400, {"error": "'answers' (objet) ou 'cases' (liste) attendu"}, 0
+    return 200, table.evaluate(answers), 1
+
+
+def route(method, path, body):
+    """Aiguille une requête ; retourne (statut HTTP, réponse, nb de cas)"""
+    if path == "/decide":
+        if method != "POST":
+            return 405, {"error": "Méthode non autorisée"}, 0
+        try:
+            payload = json.loads(body or b"null")
+        except ValueError as exc:
+            return 400, {"error": f"JSON invalide : {exc}"}, 0
+        return decide(payload)
+
+    if path in ("/metrics", "/health"):
+        if method != "GET":
+            return 405, {"error": "Méthode non autorisée"}, 0
+        if path == "/metrics":
+            return 200, metrics.snapshot(), 0
+        get_table()
+        guideline = _shared["guideline"]
+        return 200, {"status": "ok", "guideline": guideline.id,
+                     "hash": guideline.source_hash}, 0
+
+    return 404, {"error": "Route inconnue"}, 0
+
+
+async def app(scope, receive, send):
+    """Application ASGI 3"""
+    if scope["type"] == "lifespan":
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                try:
+                    await asyncio.to_thread(get_table)
+                except GuidelineError as exc:
+                    await send({"type": "lifespan.startup.failed", "message": str(exc)})
+                    return
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+    if scope["type"] != "http":
+        return
+
+    start = time.perf_counter()
+    body = b""
+    more_body = True
+    while more_body:
+        message = await receive()
+        body += message.get("body", b"")
+        more_body = message.get("more_body", False)
+
+    try:
+        # Hors de la boucle d'événements : lecture de la recommandation, jusqu'à
+        # MAX_BULK_CASES évaluations
+        status, response, cases = await asyncio.to_thread(
+            route, scope["method"], scope["path"], body)
+    except GuidelineError as exc:
+        status, response, cases = 422, {"error": f"Recommandation invalide : {exc}"}, 0
+    payload = json.dumps(response, ensure_ascii=False).encode("utf-8")
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [(b"content-type", b"application/json; charset=utf-8"),
+                    (b"content-length", str(len(payload)).encode())]
+    })
+    await send({"type": "http.response.body", "body": payload})
+    metrics.record(time.perf_counter() - start, status, cases)
+
+
+_REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found",
+            405: "Method Not Allowed", 413: "Payload Too Large", 422: "Unprocessable Content",
+            500: "Internal Server Error"}
+
+
+async def _handle_connection(reader, writer, asgi_app=app):
+    # Serveur HTTP/1.1 minimal : Content-Length obligatoire, keep-alive par défaut
+    try:
+        while True:
+            request_line = await reader.readline()
+            if not request_line.strip():
+                break
+            method, target, _ = request_line.decode("latin-1").split(" ", 2)
+            headers = []
+            while True:
+                line = await reader.readline()
+                if line in (b"\r\n", b"\n", b""):
+                    break
+                name, _, value = line.decode("latin-1").partition(":")
+                headers.append((name.strip().lower().encode("latin-1"),
+                                value.strip().encode("latin-1")))
+            header_map = dict(headers)
+            length = int(header_map.get(b"content-length", b"0"))
+            body = await reader.readexactly(length) if length else b""
+            path, _, query = target.partition("?")
+
+            scope = {"type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1",
+                     "method": method, "path": path, "query_string": query.encode("latin-1"),
+                     "headers": headers}
+            response = {"status": 500, "headers": [], "body": []}
+
+            async def receive():
+                return {"type": "http.request", "body": body, "more_body": False}
+
+            async def send(message):
+                if message["type"] == "http.response.start":
+                    response["status"] = message["status"]
+                    response["headers"] = message.get("headers", [])
+                else:
+                    response["body"].append(message.get("body", b""))
+
+            await asgi_app(scope, receive, send)
+            head = [f"HTTP/1.1 {response['status']} {_REASONS.get(response['status'], '')}"]
+            head += [f"{k.decode('latin-1')}: {v.decode('latin-1')}" for k, v in response["headers"]]
+            writer.write(("\r\n".join(head) + "\r\n\r\n").encode("latin-1"))
+            writer.write(b"".join(response["body"]))
+            await writer.drain()
+            if header_map.get(b"connection", b"").lower() == b"close":
+                break
+    except (asyncio.IncompleteReadError, ConnectionError, ValueError):
+        pass
+    finally:
+        writer.close()
+
+
+async def serve(host="127.0.0.1", port=8000):
+    """Démarre le serveur HTTP intégré et le fait tourner indéfiniment"""
+    get_table()
+    server = await asyncio.start_server(_handle_connection, host, port)
+    async with server:
+        await server.serve_forever()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="API HTTP de décision")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    args = parser.parse_args(argv)
+    print(f"API de décision sur http://{args.host}:{args.port}")
+    try:
+        asyncio.run(serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
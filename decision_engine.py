@@ -0,0 +1,125 @@
+"""Moteur de décision sans interface : l'arbre compilé en tables de correspondance
+
+Chaque préfixe de réponses (tuple des valeurs choisies depuis la racine) désigne
+soit une question, soit une feuille. Évaluer un cas revient à une suite de
+recherches dans des dictionnaires, sans parcours récursif de l'arbre.
+"""
+
+
+class DecisionTable:
+    """Tables préfixe de réponses → question, et réponses complètes → recommandation"""
+
+    def __init__(self, decision_tree):
+        # préfixe → (clé, question, valeurs possibles)
+        self.questions = {}
+        # réponses complètes → (recommandation, références)
+        self.leaves = {}
+
+        stack = [((), decision_tree)]
+        while stack:
+            prefix, node = stack.pop()
+            values = tuple(option["value"] for option in node["options"])
+            self.questions[prefix] = (node["key"], node["question"], values)
+            for option in node["options"]:
+                answers = prefix + (option["value"],)
+                if "recommendation" in option:
+                    self.leaves[answers] = (
+                        option["recommendation"], tuple(option.get("references", [])))
+                elif "next" in option:
+                    stack.append((answers, option["next"]))
+
+    def lookup(self, answers):
+        """Recommandation et références d'un tuple de réponses complet (None sinon)"""
+        return self.leaves.get(tuple(answers))
+
+    def evaluate(self, case):
+        """Évalue un cas (dictionnaire clé de question → réponse)
+
+        Retourne un dictionnaire avec le statut ("ok", "incomplet" ou "invalide"),
+        le chemin parcouru, et selon le cas la recommandation et ses références
+        ou la prochaine question sans réponse.
+        """
+        prefix = ()
+        path = []
+        while prefix not in self.leaves:
+            key, question, values = self.questions[prefix]
+            answer = case.get(key)
+            if answer is None:
+                return {
+                    "status": "incomplet",
+                    "path": path,
+                    "next_question": {"key": key, "question": question,
+                                      "options": list(values)}
+                }
+            if answer not in values:
+                return {
+                    "status": "invalide",
+                    "path": path,
+                    "error": f"Réponse '{answer}' inconnue pour '{key}' "
+                             f"(attendu : {', '.join(values)})"
+                }
+            path.append({"key": key, "question": question, "answer": answer})
+            prefix += (answer,)
+
+        recommendation, references = self.leaves[prefix]
+        return {
+            "status": "ok",
+            "path": path,
+            "recommendation": recommendation,
+            "references": list(references)
+        }
+
+
+def walk_tree(decision_tree):
+    """Parcours en profondeur itératif de l'arbre, dans l'ordre des options
+
+    Génère des événements (type, élément, chemin) :
+    - ("question", nœud, chemin) à l'entrée dans un nœud question ;
+    - ("option", option, chemin) pour chaque option, le chemin incluant l'étape
+      qui la choisit (étapes au format de display_node) ;
+    - ("cycle", option, chemin) si option["next"] est un ancêtre (non parcouru).
+    Le chemin est une liste partagée, modifiée au fil du parcours : la copier pour
+    la conserver. Mémoire en O(profondeur), quel que soit le nombre de chemins.
+    """
+    path = []
+    ancestors = {id(decision_tree)}
+    yield "question", decision_tree, path
+    stack = [(decision_tree, iter(enumerate(_options(decision_tree))))]
+    while stack:
+        node, options = stack[-1]
+        for index, option in options:
+            path.append({
+                "question": node.get("question"),
+                "answer": option.get("value") if isinstance(option, dict) else None,
+                "option_index": index,
+                "step": len(path) + 1
+            })
+            yield "option", option, path
+            child = option.get("next") if isinstance(option, dict) else None
+            if child is None:
+                path.pop()
+            elif id(child) in ancestors:
+                yield "cycle", option, path
+                path.pop()
+            else:
+                ancestors.add(id(child))
+                yield "question", child, path
+                stack.append((child, iter(enumerate(_options(child)))))
+                break
+        else:
+            stack.pop()
+            ancestors.discard(id(node))
+            if stack:
+                path.pop()
+
+
+def _options(node):
+    options = node.get("options") if isinstance(node, dict) else None
+    return options if isinstance(options, list) else []
+
+
+def iter_leaf_paths(node):
+    """Génère chaque chemin racine → feuille (étapes au format de display_node)"""
+    for kind, option, path in walk_tree(node):
+        if kind == "option" and "next" not in option:
+            yield list(path)
@@ -0,0 +1,292 @@
+"""Chargement des recommandations depuis des fichiers JSON/YAML
+
+Chaque fichier est validé puis compilé (sous-arbre, mise en page et libellés de
+chaque situation clinique). Le résultat compilé est conservé sur disque sous
+l'empreinte du contenu brut du fichier : un démarrage à froid sur un fichier
+inchangé ne refait ni l'analyse ni la mise en page. Quand le fichier change,
+seules les situations dont le contenu a changé sont recompilées.
+"""
+import hashlib
+import json
+import os
+import pickle
+import sys
+import threading
+from pathlib import Path
+
+from tree_cache import content_hash
+from tree_layout import compile_tree, extract_clinical_situation_tree
+
+# À incrémenter quand le format compilé change, pour invalider les artefacts
+COMPILER_VERSION = 6
+
+ARTIFACT_DIR = Path(os.environ.get(
+    "TOGOATB_ARTIFACT_DIR", Path(__file__).parent / ".cache" / "guidelines"))
+GUIDELINE_DIR = Path(os.environ.get(
+    "TOGOATB_GUIDELINE_DIR", Path(__file__).parent / "guidelines"))
+GUIDELINE_SUFFIXES = (".json", ".yaml", ".yml")
+
+
+class GuidelineError(ValueError):
+    """Fichier de recommandation illisible ou non conforme au schéma"""
+
+
+class CompiledSituation:
+    """Sous-arbre d'une situation clinique avec sa mise en page précompilée"""
+
+    __slots__ = ("name", "tree", "hash", "layout")
+
+    def __init__(self, name, tree, tree_hash, layout):
+        self.name = name
+        self.tree = tree
+        self.hash = tree_hash
+        self.layout = layout
+
+
+class CompiledGuideline:
+    """Recommandation compilée : arbre validé et situations cliniques précompilées
+
+    Une seule instance par fichier et par processus, partagée entre toutes les
+    sessions : elle ne doit jamais être modifiée.
+    """
+
+    def __init__(self, guideline_id, title, tree, source_hash, situations):
+        self.id = guideline_id
+        self.title = title
+        self.tree = tree
+        self.source_hash = source_hash
+        self.situations = situations
+
+
+def validate_tree(node, where="racine"):
+    """Vérifie récursivement la structure d'un nœud question"""
+    if not isinstance(node, dict):
+        raise GuidelineError(f"{where} : un nœud doit être un objet")
+    for field in ("question", "key"):
+        if not isinstance(node.get(field), str) or not node[field]:
+            raise GuidelineError(f"{where} : champ '{field}' manquant ou vide")
+    options = node.get("options")
+    if not isinstance(options, list) or not options:
+        raise GuidelineError(f"{where} : 'options' doit être une liste non vide")
+
+    for i, option in enumerate(options):
+        option_where = f"{where} > {node['key']}[{i}]"
+        if not isinstance(option, dict) or not isinstance(option.get("value"), str):
+            raise GuidelineError(f"{option_where} : 'value' manquant")
+        if ("next" in option) == ("recommendation" in option):
+            raise GuidelineError(
+                f"{option_where} : une option doit avoir soit 'next', soit 'recommendation'")
+        if "recommendation" in option:
+            if not isinstance(option["recommendation"], str):
+                raise GuidelineError(
+                    f"{option_where} : 'recommendation' doit être un texte")
+            references = option.get("references", [])
+            if not isinstance(references, list) or not all(
+                    isinstance(ref, str) for ref in references):
+                raise GuidelineError(
+                    f"{option_where} : 'references' doit être une liste de textes")
+        else:
+            validate_tree(option["next"], f"{option_where} ({option['value']})")
+
+
+def read_document(raw, suffix):
+    """Analyse le contenu brut d'un fichier JSON/YAML, sans valider l'arbre"""
+    if suffix in (".yaml", ".yml"):
+        # PyYAML est optionnel et importé à la demande : seuls les fichiers .yaml en ont besoin
+        try:
+            import yaml
+        except ImportError:
+            raise GuidelineError(
+                "PyYAML est requis pour lire les recommandations au format YAML") from None
+        try:
+            document = yaml.safe_load(raw)
+        except yaml.YAMLError as exc:
+            raise GuidelineError(f"Fichier YAML illisible : {exc}") from exc
+    else:
+        try:
+            document = json.loads(raw)
+        except ValueError as exc:
+            raise GuidelineError(f"Fichier JSON illisible : {exc}") from exc
+
+    if not isinstance(document, dict) or "tree" not in document:
+        raise GuidelineError("Le document doit contenir un objet 'tree'")
+    return document
+
+
+def parse_guideline(raw, suffix):
+    """Analyse le contenu brut d'un fichier et valide le document obtenu"""
+    document = read_document(raw, suffix)
+    validate_tree(document["tree"])
+    return document
+
+
+def compile_guideline(document, source_hash, previous=None):
+    """Compile chaque situation clinique, en réutilisant celles inchangées de previous"""
+    tree = document["tree"]
+    reusable = previous.situations if previous is not None else {}
+    situations = {}
+    for option in tree["options"]:
+        name = option["value"]
+        subtree = extract_clinical_situation_tree(tree, name)
+        subtree_hash = content_hash(subtree)
+        known = reusable.get(name)
+        if known is not None and known.hash == subtree_hash:
+            situations[name] = known
+        else:
+            situations[name] = CompiledSituation(
+                name, subtree, subtree_hash, compile_tree(subtree, branch_width=10))
+
+    return CompiledGuideline(
+        document.get("id", ""), document.get("title", ""), tree, source_hash, situations)
+
+
+def _artifact_path(source_hash):
+    return ARTIFACT_DIR / f"{source_hash}.pickle"
+
+
+def _read_artifact(source_hash):
+    try:
+        with open(_artifact_path(source_hash), "rb") as handle:
+            compiled = pickle.load(handle)
+    except (OSError, pickle.UnpicklingError, EOFError, AttributeError):
+        return None
+    return compiled if isinstance(compiled, CompiledGuideline) else None
+
+
+def _write_artifact(compiled):
+    # Écriture atomique ; un répertoire en lecture seule n'empêche pas le chargement
+    target = _artifact_path(compiled.source_hash)
+    try:
+        target.parent.mkdir(parents=True, exist_ok=True)
+        temporary = target.with_suffix(f".{os.getpid()}.tmp")
+        with open(temporary, "wb") as handle:
+            pickle.dump(compiled, handle, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temporary, target)
+    except OSError:
+        pass
+
+
+# Recommandations déjà chargées dans ce processus : chemin → (mtime, compilé)
+_loaded = {}
+_lock = threading.Lock()
+
+
+def load_guideline(path):
+    """Charge une recommandation compilée, en la recompilant si son fichier a changé"""
+    path = Path(path)
+    mtime = path.stat().st_mtime_ns
+    with _lock:
+        entry = _loaded.get(path)
+        if entry is not None and entry[0] == mtime:
+            return entry[1]
+        previous = entry[1] if entry is not None else None
+
+        raw = path.read_bytes()
+        source_hash = hashlib.sha256(
+            raw + f"|v{COMPILER_VERSION}".encode()).hexdigest()
+        if previous is not None and previous.source_hash == source_hash:
+            compiled = previous
+        else:
+            compiled = _read_artifact(source_hash)
+            if compiled is None:
+                document = parse_guideline(raw, path.suffix.lower())
+                compiled = compile_guideline(document, source_hash, previous)
+                _write_artifact(compiled)
+
+        _loaded[path] = (mtime, compiled)
+        return compiled
+
+
+def deep_sizeof(obj, seen=None):
+    """Taille mémoire (octets) d'un objet et de tout ce qu'il référence, chaque objet compté une fois"""
+    seen = set() if seen is None else seen
+    total = 0
+    stack = [obj]
+    while stack:
+        current = stack.pop()
+        if id(current) in seen:
+            continue
+        seen.add(id(current))
+        total += sys.getsizeof(current)
+        if isinstance(current, dict):
+            stack.extend(current.keys())
+            stack.extend(current.values())
+        elif isinstance(current, (list, tuple, set, frozenset)):
+            stack.extend(current)
+        elif not isinstance(current, (str, bytes, int, float, bool, type(None))):
+            if hasattr(current, "__dict__"):
+                stack.append(current.__dict__)
+            for slot in getattr(type(current), "__slots__", ()):
+                if hasattr(current, slot):
+                    stack.append(getattr(current, slot))
+    return total
+
+
+def guideline_footprint(guideline):
+    """Mémoire occupée par une recommandation compilée : arbre source, puis ce que les situations y ajoutent"""
+    seen = set()
+    tree = deep_sizeof(guideline.tree, seen)
+    situations = deep_sizeof(guideline.situations, seen)
+    return {"tree_bytes": tree, "situations_bytes": situations,
+            "total_bytes": tree + situations}
+
+
+class GuidelineRegistry:
+    """Recommandations d'un répertoire, chargées à la première demande
+
+    Chaque fichier n'est compilé qu'une fois par processus (voir load_guideline) :
+    toutes les sessions partagent la même instance.
+    """
+
+    def __init__(self, directory=GUIDELINE_DIR):
+        self.directory = Path(directory)
+        self._footprints = {}
+
+    def paths(self):
+        """Nom (nom de fichier sans extension) → chemin, relu à chaque appel pour voir les nouveaux fichiers"""
+        try:
+            files = sorted(self.directory.iterdir())
+        except OSError:
+            return {}
+        return {path.stem: path for path in files
+                if path.suffix.lower() in GUIDELINE_SUFFIXES}
+
+    def names(self):
+        return list(self.paths())
+
+    def get(self, name):
+        """Recommandation compilée partagée, chargée au premier accès"""
+        path = self.paths().get(name)
+        if path is None:
+            raise GuidelineError(f"Recommandation inconnue : {name}")
+        return load_guideline(path)
+
+    def loaded(self):
+        """Recommandations déjà chargées dans ce processus (sans en charger de nouvelle)"""
+        with _lock:
+            return {path.stem: entry[1] for path, entry in _loaded.items()
+                    if path.parent == self.directory}
+
+    def footprint(self):
+        """Empreinte mémoire de chaque recommandation chargée, calculée une fois par version"""
+        report = {}
+        for name, guideline in self.loaded().items():
+            key = (name, guideline.source_hash)
+            if key not in self._footprints:
+                self._footprints[key] = guideline_footprint(guideline)
+            report[name] = self._footprints[key]
+        return report
+
+
+# Registres partagés par le processus : répertoire → registre
+_registries = {}
+
+
+def get_registry(directory=GUIDELINE_DIR):
+    """Registre partagé des recommandations d'un répertoire"""
+    directory = Path(directory)
+    with _lock:
+        registry = _registries.get(directory)
+        if registry is None:
+            registry = _registries[directory] = GuidelineRegistry(directory)
+        return registry
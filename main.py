@@ -1,580 +1,126 @@
 import streamlit as st
-import plotly.graph_objects as go
-import plotly.express as px
-from collections import defaultdict
-
-# Arbre décisionnel simplifié
-decision_tree = {
-    "question": "Quel est le type d'infection suspectée ?",
-    "key": "type_infection",
-    "options": [
-        {
-            "value": "colonisation",
-            "recommendation": "Pas d'antibiothérapie sauf situations spécifiques (grossesse, neutropénie, geste urologique).",
-            "references": ["p.25"]
-        },
-        {
-            "value": "cystite_aigue",
-            "next": {
-                "question": "La patiente est-elle enceinte ?",
-                "key": "grossesse",
-                "options": [
-                    {
-                        "value": "oui",
-                        "recommendation": "Fosfomycine 3g dose unique ou Pivmecillinam 400 mg 2x/j pendant 5 jours",
-                        "references": ["p.26"]
-                    },
-                    {
-                        "value": "non",
-                        "next": {
-                            "question": "Y a-t-il un risque de complication ?",
-                            "key": "risque_complication",
-                            "options": [
-                                {
-                                    "value": "oui",
-                                    "recommendation": "Nitrofurantoïne 100 mg 2x/j pendant 5 jours ou Pivmecillinam",
-                                    "references": ["p.26"]
-                                },
-                                {
-                                    "value": "non",
-                                    "recommendation": "Fosfomycine 3g dose unique",
-                                    "references": ["p.26"]
-                                }
-                            ]
-                        }
-                    }
-                ]
-            }
-        },
-        {
-            "value": "cystite_recidivante",
-            "next": {
-                "question": "Est-ce un épisode isolé ou répété (>4/an) ?",
-                "key": "recurrence",
-                "options": [
-                    {
-                        "value": "isolé",
-                        "recommendation": "Traiter comme une cystite simple avec ECBU",
-                        "references": ["p.27"]
-                    },
-                    {
-                        "value": "répété",
-                        "next": {
-                            "question": "Prophylaxie nécessaire ?",
-                            "key": "prophylaxie",
-                            "options": [
-                                {
-                                    "value": "oui",
-                                    "recommendation": "Fosfomycine 3g tous les 10 jours ou Nitrofurantoïne 50 mg/j",
-                                    "references": ["p.27"]
-                                },
-                                {
-                                    "value": "non",
-                                    "recommendation": "Traitement ciblé après ECBU à chaque épisode",
-                                    "references": ["p.27"]
-                                }
-                            ]
-                        }
-                    }
-                ]
-            }
-        },
-        {
-            "value": "pyelonephrite_aigue",
-            "next": {
-                "question": "Signes de gravité ?",
-                "key": "gravite",
-                "options": [
-                    {
-                        "value": "oui",
-                        "recommendation": "Ceftriaxone 1-2g/j IV ou Ciprofloxacine IV",
-                        "references": ["p.28"]
-                    },
-                    {
-                        "value": "non",
-                        "next": {
-                            "question": "Risque de complication ?",
-                            "key": "risque_complication",
-                            "options": [
-                                {
-                                    "value": "oui",
-                                    "recommendation": "Ciprofloxacine PO 500 mg 2x/j pendant 7 jours",
-                                    "references": ["p.28"]
-                                },
-                                {
-                                    "value": "non",
-                                    "recommendation": "Ciprofloxacine PO 500 mg 2x/j pendant 5 jours",
-                                    "references": ["p.28"]
-                                }
-                            ]
-                        }
-                    }
-                ]
-            }
-        },
-        {
-            "value": "infection_urinaire_masculine",
-            "next": {
-                "question": "Signes de rétention ou prostatite ?",
-                "key": "rétention",
-                "options": [
-                    {
-                        "value": "oui",
-                        "recommendation": "Hospitalisation + Ceftriaxone IV ou Ciprofloxacine IV",
-                        "references": ["p.29"]
-                    },
-                    {
-                        "value": "non",
-                        "recommendation": "Ciprofloxacine 500 mg 2x/j pendant 10-14 jours",
-                        "references": ["p.29"]
-                    }
-                ]
-            }
-        }
-    ]
-}
-
-
-def build_tree_structure(node, parent_id="root", node_id=0, tree_data=None, level=0, x_offset=0, branch_width=8):
-    """Construit la structure de l'arbre pour la visualisation avec espacement optimisé"""
-    if tree_data is None:
-        tree_data = {"nodes": [], "edges": []}
-
-    # Calculer le nombre total d'options pour cet embranchement
-    total_options = len(node["options"])
-
-    # Ajouter le nœud actuel (question)
-    current_node_id = f"node_{node_id}"
-    tree_data["nodes"].append({
-        "id": current_node_id,
-        "label": node["question"],
-        "type": "question",
-        "level": level,
-        "x": x_offset,
-        "y": -level * 3  # Espacement vertical plus important
-    })
-
-    # Si ce n'est pas le nœud racine, ajouter l'arête
-    if parent_id != "root":
-        tree_data["edges"].append({
-            "source": parent_id,
-            "target": current_node_id
-        })
-
-    child_node_id = node_id + 1
-
-    # Calculer l'espacement horizontal pour les options
-    option_spacing = branch_width / \
-        max(1, total_options - 1) if total_options > 1 else 0
-    start_x = x_offset - (branch_width / 2)
-
-    # Traiter chaque option
-    for i, option in enumerate(node["options"]):
-        option_x = start_x + \
-            (i * option_spacing) if total_options > 1 else x_offset
-        option_node_id = f"option_{child_node_id}"
-
-        # Ajouter le nœud d'option
-        tree_data["nodes"].append({
-            "id": option_node_id,
-            "label": option["value"],
-            "type": "option",
-            "level": level + 0.5,
-            "x": option_x,
-            "y": -(level + 0.5) * 3
-        })
-
-        # Arête du nœud question vers l'option
-        tree_data["edges"].append({
-            "source": current_node_id,
-            "target": option_node_id
-        })
-
-        child_node_id += 1
-
-        if "recommendation" in option:
-            # Nœud feuille (recommandation)
-            rec_node_id = f"rec_{child_node_id}"
-            # Raccourcir le texte de recommandation pour éviter les débordements
-            short_rec = option['recommendation'][:40] + "..." if len(
-                option['recommendation']) > 40 else option['recommendation']
-
-            tree_data["nodes"].append({
-                "id": rec_node_id,
-                "label": short_rec,
-                "type": "recommendation",
-                "level": level + 1.5,
-                "x": option_x,
-                "y": -(level + 1.5) * 3,
-                "full_recommendation": option['recommendation'],
-                "references": option.get('references', [])
-            })
-
-            tree_data["edges"].append({
-                "source": option_node_id,
-                "target": rec_node_id
-            })
-
-            child_node_id += 1
-
-        elif "next" in option:
-            # Nœud suivant - ajuster la largeur de branche pour les sous-arbres
-            # Réduire la largeur pour les niveaux inférieurs
-            sub_branch_width = branch_width * 0.6
-            child_node_id = build_tree_structure(
-                option["next"], option_node_id, child_node_id, tree_data,
-                level + 1.5, option_x, sub_branch_width
-            )
-
-    return child_node_id
-
-
-def format_text_with_linebreaks(text, max_chars_per_line=25, max_lines=3):
-    """Formate le texte avec des retours à la ligne pour améliorer la lisibilité"""
-    words = text.split()
-    lines = []
-    current_line = ""
-
-    for word in words:
-        # Si ajouter ce mot dépasse la limite de caractères
-        if len(current_line + " " + word) > max_chars_per_line and current_line:
-            lines.append(current_line)
-            current_line = word
-        else:
-            if current_line:
-                current_line += " " + word
-            else:
-                current_line = word
-
-    # Ajouter la dernière ligne
-    if current_line:
-        lines.append(current_line)
-
-    # Limiter le nombre de lignes et ajouter "..." si nécessaire
-    if len(lines) > max_lines:
-        lines = lines[:max_lines-1]
-        lines.append(lines[-1][:max_chars_per_line-3] + "...")
-
-    return "<br>".join(lines)
-
-
-def is_node_in_path(node, user_path):
-    """Vérifie si un nœud est exactement dans le chemin utilisateur avec précision stricte"""
-    if not user_path:
-        return False
-
-    for step in user_path:
-        # Correspondance pour les questions - doit être exacte ou très proche
-        if node["type"] == "question":
-            # Normalisation et comparaison stricte
-            node_text = node["label"].lower().strip()
-            step_text = step["question"].lower().strip()
-
-            # Correspondance exacte d'abord
-            if node_text == step_text:
-                return True
-
-            # Puis correspondance par mots-clés uniques et spécifiques
-            if "gravité" in node_text and "gravité" in step_text:
-                return True
-            elif "complication" in node_text and "complication" in step_text:
-                return True
-            elif "enceinte" in node_text and "enceinte" in step_text:
-                return True
-            elif "récurrence" in node_text and "récurrence" in step_text:
-                return True
-            elif "prophylaxie" in node_text and "prophylaxie" in step_text:
-                return True
-            elif "rétention" in node_text and "rétention" in step_text:
-                return True
-
-        # Correspondance pour les options - doit être exactement la même
-        elif node["type"] == "option":
-            if step["answer"].lower().strip() == node["label"].lower().strip():
-                return True
-
-    return False
-
-
-def is_final_recommendation(node, user_path):
-    """Vérifie si ce nœud est LA recommandation finale unique correspondant au chemin complet"""
-    if not user_path or node["type"] != "recommendation":
-        return False
-
-    # Ne marquer qu'UNE SEULE recommandation comme finale
-    # C'est celle qui correspond au dernier niveau du chemin utilisateur
-
-    # Pour l'instant, marquer seulement s'il y a un chemin complet
-    # et que c'est une recommandation (on assumera qu'il n'y en a qu'une visible à la fin)
-    # Cette logique sera affinée selon l'arbre réel affiché
-    # Au moins 2 étapes dans le chemin pour avoir une recommandation finale
-    return len(user_path) >= 2
-
-
-def create_decision_tree_visualization(tree_data, user_path=None):
-    """Crée la visualisation de l'arbre décisionnel avec Plotly"""
-
-    # Séparer les nœuds par type pour un affichage différencié
-    question_nodes = [n for n in tree_data["nodes"] if n["type"] == "question"]
-    option_nodes = [n for n in tree_data["nodes"] if n["type"] == "option"]
-    recommendation_nodes = [
-        n for n in tree_data["nodes"] if n["type"] == "recommendation"]
-
-    # Trace pour les questions (avec disques bleus, texte noir)
-    question_trace = go.Scatter(
-        x=[n["x"] for n in question_nodes],
-        y=[n["y"] for n in question_nodes],
-        text=[],
-        mode='markers+text',
-        hoverinfo='text',
-        textposition="middle center",
-        textfont=dict(
-            size=[13 if user_path and is_node_in_path(
-                n, user_path) else 11 for n in question_nodes],
-            color="black",  # Texte noir pour tous
-            family="Arial Black"
-        ),
-        marker=dict(
-            size=[120 if user_path and is_node_in_path(
-                n, user_path) else 95 for n in question_nodes],
-            color=["#1E5091" if user_path and is_node_in_path(
-                n, user_path) else "#4472C4" for n in question_nodes],
-            line=dict(
-                width=[3 if user_path and is_node_in_path(
-                    n, user_path) else 1 for n in question_nodes],
-                color=["#00AA00" if user_path and is_node_in_path(
-                    n, user_path) else "darkgray" for n in question_nodes]  # Vert pour le chemin
-            )
-        ),
-        name="Questions",
-        showlegend=False
-    )
-
-    # Trace pour les options (texte noir, souligné en vert si dans le chemin)
-    option_trace = go.Scatter(
-        x=[n["x"] for n in option_nodes],
-        y=[n["y"] for n in option_nodes],
-        text=[],
-        mode='text',
-        hoverinfo='text',
-        textposition="middle center",
-        textfont=dict(
-            size=[15 if user_path and is_node_in_path(
-                n, user_path) else 12 for n in option_nodes],
-            color="black",  # Texte noir pour tous
-            family="Arial Black"
-        ),
-        name="Options",
-        showlegend=False
-    )
-
-    # Trace pour les recommandations (texte noir, contour vert pour la finale)
-    recommendation_trace = go.Scatter(
-        x=[n["x"] for n in recommendation_nodes],
-        y=[n["y"] for n in recommendation_nodes],
-        text=[],
-        mode='markers+text',
-        hoverinfo='text',
-        textposition="middle center",
-        textfont=dict(
-            size=[9 if user_path and is_final_recommendation(
-                n, user_path) else 8 for n in recommendation_nodes],
-            color="black"  # Texte noir pour tous
-        ),
-        marker=dict(
-            size=[85 if user_path and is_final_recommendation(
-                n, user_path) else 65 for n in recommendation_nodes],
-            color=["#FFD700" if user_path and is_final_recommendation(
-                n, user_path) else "#FF8C00" for n in recommendation_nodes],
-            line=dict(
-                width=[4 if user_path and is_final_recommendation(
-                    n, user_path) else 1 for n in recommendation_nodes],
-                color=["#00AA00" if user_path and is_final_recommendation(
-                    n, user_path) else "darkgray" for n in recommendation_nodes]  # Vert pour la finale
-            ),
-            symbol="square"
-        ),
-        name="Recommandations",
-        showlegend=False
-    )
-
-    # Ajouter le texte formaté pour chaque type de nœud
-    for node in question_nodes:
-        display_text = format_text_with_linebreaks(
-            node["label"], max_chars_per_line=30, max_lines=3)
-        question_trace['text'] += (display_text,)
-
-    for node in option_nodes:
-        # Pour les options, ajouter un soulignement vert si dans le chemin
-        display_text = format_text_with_linebreaks(
-            node["label"], max_chars_per_line=20, max_lines=2)
-        if user_path and is_node_in_path(node, user_path):
-            # Utiliser des balises HTML pour souligner en vert
-            display_text = f'<span style="text-decoration: underline; text-decoration-color: #00AA00; text-decoration-thickness: 3px;">{display_text}</span>'
-        option_trace['text'] += (display_text,)
-
-    for node in recommendation_nodes:
-        # Pour les recommandations, utiliser un formatage plus compact
-        display_text = format_text_with_linebreaks(
-            node["label"], max_chars_per_line=20, max_lines=4)
-        recommendation_trace['text'] += (display_text,)
-
-    # Créer les arêtes (vert pour le chemin choisi)
-    edge_trace = []
-    for edge in tree_data["edges"]:
-        source_node = next(
-            n for n in tree_data["nodes"] if n["id"] == edge["source"])
-        target_node = next(
-            n for n in tree_data["nodes"] if n["id"] == edge["target"])
-
-        # Déterminer la couleur de l'arête (vert si dans le chemin utilisateur)
-        edge_color = "#00AA00" if user_path and is_edge_in_path(
-            edge, user_path, tree_data) else "#CCCCCC"
-        edge_width = 5 if edge_color == "#00AA00" else 2
-
-        edge_trace.append(go.Scatter(
-            x=[source_node["x"], target_node["x"], None],
-            y=[source_node["y"], target_node["y"], None],
-            mode='lines',
-            line=dict(width=edge_width, color=edge_color),
-            showlegend=False,
-            hoverinfo='none'
-        ))
-
-    # Créer la figure avec des dimensions optimisées
-    fig = go.Figure(data=edge_trace + [question_trace, option_trace, recommendation_trace],
-                    layout=go.Layout(
-        title={
-            'text': "Arbre Décisionnel - Antibiothérapie Infections Urinaires",
-            'font': {'size': 18},
-            'x': 0.5
-        },
-        showlegend=False,
-        hovermode='closest',
-        margin=dict(b=50, l=50, r=50, t=80),
-        annotations=[
-            dict(
-                text="🟢 Chemin parcouru | 🔵 Questions | ⚫ Options | 🟠 Recommandations",
-                showarrow=False,
-                xref="paper", yref="paper",
-                x=0.5, y=-0.05,
-                xanchor="center", yanchor="top",
-                font=dict(size=14)
-            )
-        ],
-        xaxis=dict(
-            showgrid=False,
-            zeroline=False,
-            showticklabels=False,
-            range=[-15, 15]
-        ),
-        yaxis=dict(
-            showgrid=False,
-            zeroline=False,
-            showticklabels=False,
-            range=[-20, 2]
-        ),
-        plot_bgcolor='white',
-        height=800,
-        width=1200
-    ))
-
-    return fig
-
-
-def filter_path_for_tree(path, clinical_situation):
-    """Filtre le chemin pour ne garder que les étapes pertinentes pour l'arbre filtré"""
-    if not path:
-        return []
-
-    # Pour la colonisation, il n'y a qu'une étape (choix direct)
-    if clinical_situation == "colonisation":
-        return []  # Pas de sous-arbre à parcourir
-
-    # Pour les autres situations, enlever la première étape (choix de situation clinique)
-    # et garder les étapes suivantes qui correspondent au sous-arbre
-    filtered_path = []
-
-    # Commencer à partir de la deuxième étape (index 1)
-    for i in range(1, len(path)):
-        step = path[i]
-        filtered_path.append({
-            "question": step["question"],
-            "answer": step["answer"],
-            "step": len(filtered_path) + 1
-        })
-
-    return filtered_path
-
-
-def is_edge_in_path(edge, user_path, tree_data):
-    """Vérifie si une arête fait partie du chemin exact de l'utilisateur"""
-    if not user_path:
-        return False
-
-    source_node = next(
-        n for n in tree_data["nodes"] if n["id"] == edge["source"])
-    target_node = next(
-        n for n in tree_data["nodes"] if n["id"] == edge["target"])
-
-    # Une arête est dans le chemin SEULEMENT si :
-    # 1. Le nœud source est une question dans le chemin ET le nœud target est l'option correspondante
-    # 2. OU le nœud source est une option dans le chemin ET le nœud target est la question suivante
-    # 3. OU le nœud source est une option dans le chemin ET le nœud target est la recommandation finale
-
-    source_in_path = is_node_in_path(source_node, user_path)
-    target_in_path = is_node_in_path(target_node, user_path)
-    target_is_final_rec = is_final_recommendation(target_node, user_path)
-
-    # Être très restrictif : les deux nœuds doivent être dans le chemin
-    # OU c'est une connexion vers la recommandation finale
-    return (source_in_path and target_in_path) or (source_in_path and target_is_final_rec)
-
-
-def extract_clinical_situation_tree(decision_tree, clinical_situation):
-    """Extrait la partie de l'arbre correspondant à la situation clinique choisie"""
-
-    # Trouver l'option correspondant à la situation clinique
-    selected_option = None
-    for option in decision_tree["options"]:
-        if option["value"] == clinical_situation:
-            selected_option = option
-            break
-
-    if not selected_option:
-        return decision_tree  # Retourner l'arbre complet si non trouvé
-
-    # Si l'option a une recommandation directe, créer un arbre simple
-    if "recommendation" in selected_option:
-        return {
-            "question": f"Situation: {clinical_situation}",
-            "key": "situation",
-            "options": [selected_option]
-        }
-
-    # Si l'option a un sous-arbre, le retourner
-    elif "next" in selected_option:
-        return selected_option["next"]
-
-    return decision_tree
-
+import uuid
+
+from audit import get_audit_log
+from compiled_tree import TYPE_CODES
+from guidelines import get_registry
+from path_stats import get_path_stats, start_warming, warming_status
+from prerender import get_collapsed_view, get_path_figure, path_id, RENDERER, RENDERERS
+from profiler import aggregate, import_profile, RerunProfiler
+from search_index import get_index
+from tree_cache import cache_stats
+from tree_layout import filter_path_for_tree, LOD_THRESHOLD
+
+# Registre des recommandations (guidelines/) : chacune est compilée au premier accès
+# puis partagée par toutes les sessions du processus (recompilée si son fichier change)
+registry = get_registry()
+DEFAULT_GUIDELINE = "infections_urinaires"
+
+
+def widget_key(node, path):
+    """Clé de widget propre à la position du nœud (une même clé de question peut
+    apparaître dans plusieurs branches, ex. risque_complication)"""
+    prefix = "/".join(str(step["option_index"]) for step in path)
+    return f"{node['key']}@{prefix}"
+
+
+def render_text_path(path):
+    """Affiche le chemin textuel, construit une seule fois par chemin et par session"""
+    path_id = tuple(step["option_index"] for step in path)
+    cached = st.session_state.get("text_path")
+    if cached is None or cached[0] != path_id:
+        blocks = []
+        for i, step in enumerate(path, 1):
+            blocks.append(f"**Étape {i}:** {step['question']}")
+            blocks.append(f"➜ *Réponse:* **{step['answer']}**")
+            if i < len(path):
+                blocks.append("⬇️")
+        cached = (path_id, "\n\n".join(blocks))
+        st.session_state["text_path"] = cached
+    st.markdown(cached[1])
+
+
+def expand_branches(guideline, situation, path):
+    """Grands arbres : branches repliées que l'utilisateur a choisi de déplier (mémorisées par session)"""
+    expanded = st.session_state.setdefault(f"expanded:{guideline.id}:{situation.name}", [])
+    layout = situation.layout
+    # Même vue réduite (cache partagé) que celle de la figure de ce chemin
+    view = get_collapsed_view(guideline, path, tuple(expanded))
+    # Nœuds résumés lus sur les colonnes de la vue (type, parent, libellés)
+    choices = {}
+    summary = TYPE_CODES["summary"]
+    for i, code in enumerate(view.kinds):
+        if code == summary:
+            option = view.parent[i]
+            question = view.parent[option]
+            extra = view.extras[i]
+            label = f"{view.texts[question]} → {view.texts[option]} ({extra['hidden']} nœuds)"
+            choices[label] = extra["option"]
+
+    # Rappels exécutés avant le rerun : la vue suivante tient déjà compte du choix
+    def expand():
+        choice = st.session_state.get("expand_choice")
+        if choice in choices:
+            expanded.append(choices[choice])
+        st.session_state["expand_choice"] = None
+
+    st.caption(f"Grand arbre ({len(layout)} nœuds) : les branches hors du chemin sont repliées.")
+    column_choice, column_expand, column_reset = st.columns([4, 1, 1])
+    column_choice.selectbox("Branche à déplier", list(choices), index=None,
+                            placeholder="Branches repliées", key="expand_choice")
+    column_expand.button("Déplier", on_click=expand)
+    column_reset.button("Tout replier", on_click=expanded.clear, disabled=not expanded)
+    return tuple(expanded)
+
+
+def display_node(guideline, node, answers, path, profiler=None, renderer=RENDERER):
+    """Affiche la question node puis la suite du parcours ; True si une recommandation est affichée"""
+    profiler = profiler or RerunProfiler()
+    # Parcours conservé dans la session : les étapes au-dessus de la réponse
+    # modifiée sont réutilisées, seul le suffixe est invalidé et recalculé
+    traversal = st.session_state.setdefault("traversal", [])
+    depth = len(path)
+    key = widget_key(node, path)
 
-def display_node(node, answers, path):
     st.markdown(f"**{node['question']}**")
     options = [opt["value"] for opt in node["options"]]
-    choice = st.radio("Sélectionnez une option :", options, key=node["key"])
-    selected = next(opt for opt in node["options"] if opt["value"] == choice)
+    choice = st.radio("Sélectionnez une option :", options, key=key)
+    option_index = options.index(choice)
+    selected = node["options"][option_index]
     answers[node["key"]] = choice
-    path.append({
-        "question": node['question'],
-        "answer": choice,
-        "step": len(path) + 1
-    })
+
+    if (depth < len(traversal) and traversal[depth]["widget_key"] == key
+            and traversal[depth]["option_index"] == option_index):
+        step = traversal[depth]
+    else:
+        del traversal[depth:]
+        step = {
+            "question": node['question'],
+            "answer": choice,
+            "option_index": option_index,
+            "step": depth + 1,
+            "widget_key": key
+        }
+        traversal.append(step)
+    path.append(step)
 
     if "recommendation" in selected:
+        # Chemin complet : les étapes mémorisées au-delà ne sont plus valides
+        del traversal[len(path):]
         st.success(f"Recommandation : {selected['recommendation']}")
         st.markdown(f"🔖 Références : {', '.join(selected['references'])}")
 
+        # Journal d'audit : une entrée par recommandation affichée, pas à chaque rerun
+        # (mise en file seulement, l'écriture se fait en arrière-plan)
+        shown = (guideline.id, tuple(step["option_index"] for step in path))
+        if st.session_state.get("audited") != shown:
+            st.session_state["audited"] = shown
+            get_audit_log().record(
+                guideline, path, selected["recommendation"], selected.get("references", []),
+                session=st.session_state.setdefault("session_id", uuid.uuid4().hex))
+            # Compteur d'usage du chemin : sert au préchauffage du prochain démarrage
+            get_path_stats().hit(guideline.id, path_id(path))
+
         # Déterminer la situation clinique (premier choix)
         clinical_situation = path[0]['answer'] if path else None
 
@@ -582,15 +128,10 @@ def display_node(node, answers, path):
         st.markdown("---")
         st.markdown(f"### 🌳 Arbre Décisionnel - {clinical_situation}")
 
-        # Extraire et construire la structure de l'arbre pour la situation clinique
-        filtered_tree = extract_clinical_situation_tree(
-            decision_tree, clinical_situation)
-        tree_data = {"nodes": [], "edges": []}
-        build_tree_structure(
-            filtered_tree, tree_data=tree_data, branch_width=10)
-
-        # Filtrer le chemin pour correspondre à l'arbre filtré
-        filtered_path = filter_path_for_tree(path, clinical_situation)
+        # Sous-arbre de la situation clinique (mise en page précompilée) et chemin filtré
+        with profiler.span("tree_extraction"):
+            situation = guideline.situations[clinical_situation]
+            filtered_path = filter_path_for_tree(path, clinical_situation)
 
         # Debug: afficher le chemin filtré
         if filtered_path:
@@ -600,33 +141,137 @@ def display_node(node, answers, path):
         else:
             st.write("**Debug - Aucun chemin filtré (situation directe)**")
 
-        # Créer et afficher la visualisation avec le chemin filtré
-        fig = create_decision_tree_visualization(tree_data, filtered_path)
-        st.plotly_chart(fig, use_container_width=True)
+        # Grand arbre : sous-arbres hors chemin repliés, dépliables à la demande
+        expanded = ()
+        if len(situation.layout) > LOD_THRESHOLD:
+            expanded = expand_branches(guideline, situation, path)
+
+        # Créer (ou reprendre du cache partagé) la visualisation avec le chemin filtré
+        # (figure pré-rendue par prerender.py si disponible, sinon rendu en direct)
+        with profiler.span("figure"):
+            fig = get_path_figure(guideline, path, expanded, renderer)
+        if renderer == "svg":
+            # SVG statique en ligne : ni bundle Plotly ni figure JSON à charger côté client
+            with profiler.span("svg"):
+                st.markdown(f'<div style="overflow-x:auto">{fig}</div>', unsafe_allow_html=True)
+        else:
+            with profiler.span("plotly_chart"):
+                st.plotly_chart(fig, use_container_width=True)
 
         # Affichage du chemin décisionnel textuel complet
-        st.markdown("### 🗺️ Chemin décisionnel parcouru")
-        for i, step in enumerate(path, 1):
-            st.markdown(f"**Étape {i}:** {step['question']}")
-            st.markdown(f"➜ *Réponse:* **{step['answer']}**")
-            if i < len(path):
-                st.markdown("⬇️")
+        with profiler.span("text_path"):
+            st.markdown("### 🗺️ Chemin décisionnel parcouru")
+            render_text_path(path)
 
         st.info(
             f"**Situation clinique identifiée:** {path[0]['answer'] if path else 'Non définie'}")
+        return True
 
     elif "next" in selected:
-        display_node(selected["next"], answers, path)
+        return display_node(guideline, selected["next"], answers, path, profiler, renderer)
+    return False
 
 
 def main():
     st.set_page_config(page_title="Assistant Antibiothérapie", page_icon="💊")
-    st.title("💊 Assistant Antibiothérapie – Infections Urinaires")
+
+    # Sélecteur sur les noms de fichiers : les titres ne sont connus qu'une fois chargés
+    names = registry.names()
+    name = st.sidebar.selectbox(
+        "📚 Recommandation", names,
+        index=names.index(DEFAULT_GUIDELINE) if DEFAULT_GUIDELINE in names else 0,
+        key="guideline")
+    guideline = registry.get(name)
+    # Premier accès dans ce processus : figures des chemins les plus fréquents
+    # construites en arrière-plan dans le cache partagé
+    start_warming(guideline)
+    # Changement de recommandation : le parcours de la précédente n'a plus de sens
+    if st.session_state.get("traversal_guideline") != guideline.id:
+        st.session_state["traversal_guideline"] = guideline.id
+        st.session_state.pop("traversal", None)
+        st.session_state.pop("text_path", None)
+
+    renderer = st.sidebar.selectbox(
+        "🖼️ Rendu de l'arbre", RENDERERS,
+        index=RENDERERS.index(RENDERER) if RENDERER in RENDERERS else 0, key="renderer",
+        help="svg : image statique légère, recommandée sur les connexions lentes")
+
+    st.title(f"💊 Assistant {guideline.title}")
     st.write("Répondez aux questions pour obtenir une recommandation thérapeutique.")
 
+    # Recherche dans les recommandations et références (index construit une fois par processus)
+    with st.sidebar.expander("🔎 Rechercher une recommandation"):
+        query = st.text_input("Molécule, dose ou page (ex. ciprofloxacine, p.28)",
+                              key="search_query")
+        if query:
+            results = get_index([guideline]).search(query, limit=20)
+            if not results:
+                st.caption("Aucun résultat")
+            for entry in results:
+                answers = " → ".join(step["answer"] for step in entry["path"])
+                st.markdown(f"**{entry['recommendation']}**  \n"
+                            f"{answers}  \n🔖 {', '.join(entry['references'])}")
+
+    # Profileur optionnel : durée (et mémoire) de chaque étape du rerun
+    with st.sidebar.expander("⏱️ Profileur"):
+        profiling = st.toggle("Activer le profileur", key="profiler_enabled")
+        track_memory = st.checkbox(
+            "Mesurer la mémoire", key="profiler_memory", disabled=not profiling)
+        profiler_panel = st.container()
+    profiler = RerunProfiler(enabled=profiling, track_memory=track_memory)
+
     answers = {}
     path = []
-    display_node(decision_tree, answers, path)
+    try:
+        with profiler.span("display_node"):
+            recommended = display_node(guideline, guideline.tree, answers, path, profiler, renderer)
+    finally:
+        # Suivi mémoire limité à ce rerun : tracemalloc n'est pas laissé actif
+        profiler.close()
+    if not recommended:
+        # Rerun sans recommandation : seule la répétition immédiate d'un même
+        # affichage est dédupliquée, un retour à la recommandation est journalisé
+        st.session_state.pop("audited", None)
+
+    if profiling:
+        session_id = st.session_state.setdefault("session_id", uuid.uuid4().hex)
+        profiler.export(session_id, situation=path[0]["answer"] if path else None)
+        with profiler_panel:
+            for span in profiler.spans:
+                memory = f", {span['mem_kib']:+.1f} Kio" if "mem_kib" in span else ""
+                st.caption(f"**{span['stage']}** : {span['ms']:.2f} ms{memory}")
+            st.caption(f"**total** : {profiler.total_ms():.2f} ms")
+            if st.button("Agréger les traces (p50 / p95)"):
+                for stage, stats in aggregate().items():
+                    st.caption(f"**{stage}** : p50 {stats['p50_ms']:.2f} ms, "
+                               f"p95 {stats['p95_ms']:.2f} ms ({stats['count']} mesures)")
+            if st.button("Profiler le démarrage (imports)"):
+                report = import_profile("main")
+                st.caption(f"**import main** : {report['total_ms']:.0f} ms")
+                for name, ms in report["packages"]:
+                    st.caption(f"**{name}** : {ms:.1f} ms")
+
+    with st.sidebar.expander("⚙️ Cache de l'arbre"):
+        for level, stats in cache_stats().items():
+            st.caption(
+                f"**{level}** : {stats['hits']} succès / {stats['misses']} échecs, "
+                f"{stats['size']}/{stats['maxsize']} entrées, "
+                f"{stats['evictions']} évictions")
+        for (warmed_id, _), status in warming_status().items():
+            if status["warmed"] is None:
+                st.caption(f"**préchauffage {warmed_id}** : en cours")
+            elif status["error"]:
+                st.caption(f"**préchauffage {warmed_id}** : échec ({status['error']})")
+            else:
+                st.caption(f"**préchauffage {warmed_id}** : {status['warmed']} figures "
+                           f"en {status['seconds']:.2f} s")
+
+    with st.sidebar.expander("📚 Recommandations chargées"):
+        for loaded_name, footprint in registry.footprint().items():
+            st.caption(
+                f"**{loaded_name}** : {footprint['total_bytes'] / 1024:.0f} Kio "
+                f"(arbre {footprint['tree_bytes'] / 1024:.0f} Kio, "
+                f"situations compilées {footprint['situations_bytes'] / 1024:.0f} Kio)")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,167 @@
+"""Compteurs d'usage par chemin et préchauffage des figures les plus demandées
+
+Chaque recommandation affichée incrémente un compteur (recommandation, chemin)
+en mémoire ; les compteurs sont fusionnés dans `.cache/path_hits.json`
+(`TOGOATB_PATH_STATS`) par un thread d'arrière-plan et à l'arrêt du processus.
+À la première utilisation d'une recommandation dans un processus, les figures
+de ses TOGOATB_WARM_TOP chemins les plus fréquents sont construites en
+arrière-plan dans le cache partagé : la première requête sur un chemin courant
+après un redémarrage ne paie plus le rendu. Seules les figures du rendu par
+défaut du processus (prerender.RENDERER, branches repliées) sont préchauffées ;
+une session qui choisit l'autre rendu construit les siennes à la demande.
+"""
+import atexit
+import json
+import os
+import threading
+import time
+from pathlib import Path
+
+STATS_PATH = Path(os.environ.get(
+    "TOGOATB_PATH_STATS", Path(__file__).parent / ".cache" / "path_hits.json"))
+WARM_TOP = int(os.environ.get("TOGOATB_WARM_TOP", "20"))
+# Délai avant le préchauffage : la première question d'un worker neuf passe avant
+WARM_DELAY = float(os.environ.get("TOGOATB_WARM_DELAY", "2.0"))
+
+
+class PathStats:
+    """Compteurs recommandation → identifiant de chemin (prerender.path_id) → nombre d'affichages"""
+
+    def __init__(self, path=STATS_PATH, save_interval=30.0):
+        self.path = Path(path)
+        self.save_interval = save_interval
+        self.counts = self._read()
+        # Incréments pas encore écrits : fusionnés avec ceux des autres processus à l'écriture
+        self.pending = {}
+        self._lock = threading.Lock()
+        self._save_lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="path-stats", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def _read(self):
+        try:
+            with open(self.path, encoding="utf-8") as handle:
+                counts = json.load(handle)
+        except (OSError, ValueError):
+            return {}
+        return counts if isinstance(counts, dict) else {}
+
+    def hit(self, guideline_id, identifier):
+        """Compte un affichage du chemin (en mémoire seulement)"""
+        with self._lock:
+            for table in (self.counts, self.pending):
+                paths = table.setdefault(guideline_id, {})
+                paths[identifier] = paths.get(identifier, 0) + 1
+
+    def top(self, guideline_id, n=WARM_TOP):
+        """Les n chemins les plus affichés d'une recommandation, du plus fréquent au moins fréquent"""
+        with self._lock:
+            paths = dict(self.counts.get(guideline_id, {}))
+        return sorted(paths, key=lambda identifier: (-paths[identifier], identifier))[:n]
+
+    def save(self):
+        """Ajoute les incréments en attente au fichier (écriture atomique)"""
+        with self._save_lock:
+            self._save()
+
+    def _save(self):
+        with self._lock:
+            pending, self.pending = self.pending, {}
+        if not pending:
+            return
+        counts = self._read()
+        for guideline_id, paths in pending.items():
+            merged = counts.setdefault(guideline_id, {})
+            for identifier, count in paths.items():
+                merged[identifier] = merged.get(identifier, 0) + count
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            temporary = self.path.with_suffix(f".{os.getpid()}.tmp")
+            temporary.write_text(json.dumps(counts, ensure_ascii=False), encoding="utf-8")
+            os.replace(temporary, self.path)
+        except OSError:
+            # Répertoire en lecture seule : les incréments sont conservés pour le prochain essai
+            with self._lock:
+                for guideline_id, paths in pending.items():
+                    table = self.pending.setdefault(guideline_id, {})
+                    for identifier, count in paths.items():
+                        table[identifier] = table.get(identifier, 0) + count
+            return
+        with self._lock:
+            # Compteurs des autres processus pris en compte, plus les incréments survenus entre-temps
+            for guideline_id, paths in self.pending.items():
+                merged = counts.setdefault(guideline_id, {})
+                for identifier, count in paths.items():
+                    merged[identifier] = merged.get(identifier, 0) + count
+            self.counts = counts
+
+    def _run(self):
+        while not self._stopped.wait(self.save_interval):
+            self.save()
+
+    def close(self):
+        self._stopped.set()
+        self.save()
+
+
+def warm_guideline(guideline, stats, top=WARM_TOP):
+    """Construit dans le cache partagé les figures des chemins les plus affichés ; retourne leur nombre
+
+    Figures du rendu par défaut (prerender.RENDERER) seulement.
+    """
+    from prerender import get_path_figure, path_from_id
+
+    warmed = 0
+    for identifier in stats.top(guideline.id, top):
+        path = path_from_id(guideline.tree, identifier)
+        if path is None:
+            continue  # chemin disparu depuis une modification de l'arbre
+        get_path_figure(guideline, path)
+        warmed += 1
+    return warmed
+
+
+# Compteurs partagés et recommandations déjà préchauffées dans ce processus
+_stats = None
+_warmed = {}
+_lock = threading.Lock()
+
+
+def get_path_stats():
+    global _stats
+    with _lock:
+        if _stats is None:
+            _stats = PathStats()
+        return _stats
+
+
+def start_warming(guideline, top=WARM_TOP, delay=WARM_DELAY):
+    """Lance (une fois par version de recommandation et par processus) le préchauffage en arrière-plan"""
+    key = (guideline.id, guideline.source_hash)
+    with _lock:
+        if key in _warmed or top <= 0:
+            return
+        _warmed[key] = {"started": time.time(), "warmed": None, "seconds": None, "error": None}
+
+    def run():
+        time.sleep(delay)
+        start = time.perf_counter()
+        count, error = 0, None
+        try:
+            count = warm_guideline(guideline, get_path_stats(), top)
+        except Exception as exc:
+            # Préchauffage best effort : un échec n'a d'autre effet qu'un démarrage à froid
+            error = f"{type(exc).__name__}: {exc}"
+        with _lock:
+            _warmed[key].update(warmed=count, seconds=round(time.perf_counter() - start, 3),
+                                error=error)
+
+    threading.Thread(target=run, name=f"warm-{guideline.id}", daemon=True).start()
+
+
+def warming_status():
+    """État du préchauffage de chaque recommandation : (id, empreinte) → figures, durée et erreur"""
+    with _lock:
+        return {key: dict(status) for key, status in _warmed.items()}
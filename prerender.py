@@ -0,0 +1,212 @@
+"""Pré-rendu des figures de chaque chemin jusqu'à une recommandation
+
+Usage :
+    python prerender.py [--guideline guidelines/infections_urinaires.json] [--output-dir DIR]
+
+Chaque chemin racine → feuille de l'arbre est rendu (figure de sa situation
+clinique, chemin mis en évidence) et sérialisé en JSON, avec un manifeste indexé
+par chemin. À l'exécution, l'application charge ces figures au lieu de les
+construire ; le manifeste n'est utilisé que si l'empreinte de la recommandation
+et celle du code de rendu correspondent, sinon le rendu se fait en direct.
+"""
+import argparse
+import hashlib
+import importlib.util
+import json
+import os
+import threading
+from pathlib import Path
+
+from decision_engine import iter_leaf_paths
+from guidelines import load_guideline
+from tree_cache import get_figure, get_view
+from tree_layout import LOD_THRESHOLD, collapse_tree, filter_path_for_tree
+
+# Plotly et tree_visualization ne sont importés qu'au premier rendu ou chargement
+# de figure : le démarrage d'un worker jusqu'à la première question ne les paie pas
+
+FIGURE_DIR = Path(os.environ.get(
+    "TOGOATB_FIGURE_DIR", Path(__file__).parent / ".cache" / "figures"))
+MANIFEST_NAME = "manifest.json"
+DEFAULT_GUIDELINE = Path(__file__).parent / "guidelines" / "infections_urinaires.json"
+
+# Rendu de l'arbre : figure Plotly interactive, ou SVG statique (tree_svg) bien plus
+# léger pour les connexions lentes ; TOGOATB_RENDERER fixe le choix par défaut
+RENDERERS = ("plotly", "svg")
+RENDERER = os.environ.get("TOGOATB_RENDERER", "plotly")
+
+# Modules dont dépend la figure Plotly (construction, mise en page, arbre compilé)
+RENDERER_MODULES = ("tree_visualization", "tree_layout", "compiled_tree")
+
+
+def _renderer_hash(modules=RENDERER_MODULES):
+    digest = hashlib.sha256()
+    for module in modules:
+        digest.update(Path(importlib.util.find_spec(module).origin).read_bytes())
+    return digest.hexdigest()[:16]
+
+
+# Empreinte du code de rendu : des figures produites par un autre code sont ignorées
+RENDERER_HASH = _renderer_hash()
+
+
+def path_id(path):
+    """Identifiant d'un chemin : indices des options choisies depuis la racine"""
+    return "/".join(str(step["option_index"]) for step in path)
+
+
+def path_from_id(decision_tree, identifier):
+    """Étapes (format de display_node) d'un chemin désigné par path_id, ou None s'il n'existe plus"""
+    node, path = decision_tree, []
+    for part in identifier.split("/") if identifier else ():
+        if node is None or not part.isdigit() or int(part) >= len(node["options"]):
+            return None
+        option = node["options"][int(part)]
+        path.append({
+            "question": node["question"],
+            "answer": option["value"],
+            "option_index": int(part),
+            "step": len(path) + 1
+        })
+        node = option.get("next")
+    return path if path and node is None else None
+
+
+def prerender_guideline(guideline, output_dir=FIGURE_DIR):
+    """Rend et écrit la figure de chaque chemin, puis le manifeste ; retourne le nombre de figures"""
+    from tree_visualization import create_decision_tree_visualization
+
+    target = Path(output_dir) / guideline.id
+    target.mkdir(parents=True, exist_ok=True)
+    figures = {}
+    for path in iter_leaf_paths(guideline.tree):
+        clinical_situation = path[0]["answer"]
+        situation = guideline.situations[clinical_situation]
+        fig = create_decision_tree_visualization(
+            situation.layout, filter_path_for_tree(path, clinical_situation),
+            title=guideline.title)
+        identifier = path_id(path)
+        filename = identifier.replace("/", "-") + ".json"
+        (target / filename).write_text(fig.to_json(), encoding="utf-8")
+        figures[identifier] = {
+            "file": filename,
+            "situation": clinical_situation,
+            "answers": [step["answer"] for step in path]
+        }
+
+    # Manifeste écrit en dernier (et atomiquement) : il ne référence que des fichiers complets
+    manifest = {
+        "guideline": guideline.id,
+        "tree_hash": guideline.source_hash,
+        "renderer_hash": RENDERER_HASH,
+        "figures": figures
+    }
+    temporary = target / f"{MANIFEST_NAME}.{os.getpid()}.tmp"
+    temporary.write_text(json.dumps(manifest, ensure_ascii=False, indent=1), encoding="utf-8")
+    os.replace(temporary, target / MANIFEST_NAME)
+    return len(figures)
+
+
+# Manifestes déjà lus : répertoire → (mtime, manifeste)
+_manifests = {}
+_lock = threading.Lock()
+
+
+def _read_manifest(directory):
+    manifest_path = directory / MANIFEST_NAME
+    try:
+        mtime = manifest_path.stat().st_mtime_ns
+    except OSError:
+        return None
+    with _lock:
+        cached = _manifests.get(directory)
+        if cached is not None and cached[0] == mtime:
+            return cached[1]
+        try:
+            manifest = json.loads(manifest_path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            manifest = None
+        _manifests[directory] = (mtime, manifest)
+        return manifest
+
+
+def load_prerendered(guideline, path, figure_dir=FIGURE_DIR):
+    """Figure pré-rendue d'un chemin complet, ou None si absente ou périmée"""
+    directory = Path(figure_dir) / guideline.id
+    manifest = _read_manifest(directory)
+    if (manifest is None or manifest.get("tree_hash") != guideline.source_hash
+            or manifest.get("renderer_hash") != RENDERER_HASH):
+        return None
+    entry = manifest["figures"].get(path_id(path))
+    if entry is None:
+        return None
+    try:
+        text = (directory / entry["file"]).read_text(encoding="utf-8")
+    except OSError:
+        return None
+    import plotly.graph_objects as go
+
+    # Figure déjà validée à sa construction : pas de nouvelle validation au chargement
+    return go.Figure(json.loads(text), _validate=False)
+
+
+def get_collapsed_view(guideline, path, expanded=()):
+    """Vue réduite (collapse_tree) de l'arbre d'un chemin complet, None si l'arbre n'est pas réduit
+
+    Vue partagée (tree_cache) : la liste des branches dépliables et la figure du
+    même chemin ne la construisent qu'une fois.
+    """
+    clinical_situation = path[0]["answer"]
+    situation = guideline.situations[clinical_situation]
+    layout = situation.layout
+    if len(layout) <= LOD_THRESHOLD:
+        return None
+    user_path = filter_path_for_tree(path, clinical_situation)
+    return get_view(clinical_situation, situation.hash, user_path, expanded,
+                    lambda: collapse_tree(layout, layout.resolve_path(user_path), expanded))
+
+
+def get_path_figure(guideline, path, expanded=(), renderer=RENDERER):
+    """Figure d'un chemin complet depuis le cache partagé (pré-rendue ou rendue en direct en cas d'échec)
+
+    Avec renderer="svg", le résultat est le texte SVG de tree_svg (jamais pré-rendu).
+    """
+    clinical_situation = path[0]["answer"]
+    situation = guideline.situations[clinical_situation]
+    if renderer == "svg":
+        from tree_svg import create_decision_tree_svg
+
+        def build(layout, user_path):
+            return create_decision_tree_svg(layout, user_path, expanded=expanded,
+                                            title=guideline.title,
+                                            view=get_collapsed_view(guideline, path, expanded))
+    else:
+        from tree_visualization import create_decision_tree_visualization
+
+        def build(layout, user_path):
+            return ((not expanded and load_prerendered(guideline, path))
+                    or create_decision_tree_visualization(
+                        layout, user_path, expanded=expanded, title=guideline.title,
+                        view=get_collapsed_view(guideline, path, expanded)))
+
+    return get_figure(
+        clinical_situation, situation.tree, filter_path_for_tree(path, clinical_situation),
+        lambda subtree: situation.layout, build,
+        tree_hash=situation.hash, variant=(renderer, expanded, guideline.title))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Pré-rend les figures de tous les chemins de l'arbre décisionnel")
+    parser.add_argument("--guideline", default=str(DEFAULT_GUIDELINE),
+                        help="fichier de recommandation (JSON/YAML)")
+    parser.add_argument("--output-dir", default=str(FIGURE_DIR))
+    args = parser.parse_args(argv)
+
+    guideline = load_guideline(args.guideline)
+    count = prerender_guideline(guideline, args.output_dir)
+    print(f"{count} figures pré-rendues dans {Path(args.output_dir) / guideline.id}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,209 @@
+"""Instrumentation des reruns : durée (et mémoire) de chaque étape, traces JSON-lines
+
+Usage de l'agrégateur :
+    python profiler.py [.cache/rerun_traces.jsonl]
+affiche p50/p95 par étape sur toutes les sessions enregistrées.
+
+Profil du démarrage à froid :
+    python profiler.py --imports [main]
+importe le module dans un interpréteur neuf (python -X importtime) et affiche le
+temps d'import par paquet et les modules les plus coûteux.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager, nullcontext
+from pathlib import Path
+
+TRACE_PATH = Path(os.environ.get(
+    "TOGOATB_TRACE_FILE", Path(__file__).parent / ".cache" / "rerun_traces.jsonl"))
+
+_write_lock = threading.Lock()
+
+# Reruns en cours qui mesurent la mémoire ; tracemalloc n'est actif que pendant
+# ces reruns (sauf s'il était déjà démarré par ailleurs)
+_memory_lock = threading.Lock()
+_memory_users = 0
+_memory_started = False
+
+
+class RerunProfiler:
+    """Chronomètre les étapes d'un rerun ; inactif, chaque span ne coûte presque rien"""
+
+    def __init__(self, enabled=False, track_memory=False):
+        self.enabled = enabled
+        self.track_memory = enabled and track_memory
+        self.spans = []
+        self._started = time.perf_counter()
+        self._closed = False
+        if self.track_memory:
+            _acquire_tracing()
+
+    def span(self, name):
+        """Contexte mesurant une étape nommée"""
+        if not self.enabled:
+            return nullcontext()
+        return self._span(name)
+
+    @contextmanager
+    def _span(self, name):
+        memory_before = tracemalloc.get_traced_memory()[0] if self.track_memory else 0
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            record = {"stage": name, "ms": round((time.perf_counter() - start) * 1000, 3)}
+            if self.track_memory:
+                delta = tracemalloc.get_traced_memory()[0] - memory_before
+                record["mem_kib"] = round(delta / 1024, 1)
+            self.spans.append(record)
+
+    def close(self):
+        """Fin du rerun : arrête tracemalloc si plus aucun rerun ne mesure la mémoire"""
+        if self.track_memory and not self._closed:
+            self._closed = True
+            _release_tracing()
+
+    def total_ms(self):
+        return round((time.perf_counter() - self._started) * 1000, 3)
+
+    def export(self, session_id, path=TRACE_PATH, **extra):
+        """Ajoute les spans de ce rerun au fichier de traces (une ligne JSON par rerun)"""
+        if not self.enabled:
+            return
+        record = {"ts": round(time.time(), 3), "session": session_id,
+                  "total_ms": self.total_ms(), "spans": self.spans}
+        record.update(extra)
+        line = json.dumps(record, ensure_ascii=False) + "\n"
+        try:
+            with _write_lock:
+                Path(path).parent.mkdir(parents=True, exist_ok=True)
+                with open(path, "a", encoding="utf-8") as handle:
+                    handle.write(line)
+        except OSError:
+            pass
+
+
+def _acquire_tracing():
+    global _memory_users, _memory_started
+    with _memory_lock:
+        if _memory_users == 0 and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            _memory_started = True
+        _memory_users += 1
+
+
+def _release_tracing():
+    global _memory_users, _memory_started
+    with _memory_lock:
+        _memory_users -= 1
+        if _memory_users == 0 and _memory_started:
+            tracemalloc.stop()
+            _memory_started = False
+
+
+def _percentile(values, q):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def aggregate(path=TRACE_PATH):
+    """p50/p95 (ms) par étape sur toutes les traces du fichier"""
+    durations = {}
+    sessions = set()
+    try:
+        with open(path, encoding="utf-8") as handle:
+            for line in handle:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                sessions.add(record.get("session"))
+                durations.setdefault("total", []).append(record["total_ms"])
+                for span in record.get("spans", []):
+                    durations.setdefault(span["stage"], []).append(span["ms"])
+    except OSError:
+        return {}
+
+    return {
+        stage: {"count": len(values),
+                "p50_ms": round(statistics.median(values), 3),
+                "p95_ms": round(_percentile(values, 0.95), 3),
+                "sessions": len(sessions)}
+        for stage, values in durations.items()
+    }
+
+
+def import_profile(module="main", top=15):
+    """Temps d'import à froid d'un module, mesuré dans un interpréteur neuf
+
+    Retourne le total (ms), le temps propre cumulé par paquet de premier niveau
+    et les top modules au temps cumulé (sous-modules compris) le plus élevé.
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=Path(__file__).parent, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1] if result.stderr else module)
+
+    packages = {}
+    modules = []
+    total_us = 0
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        depth = (len(name) - len(name.lstrip())) // 2
+        name = name.strip()
+        package = name.split(".")[0]
+        packages[package] = packages.get(package, 0) + int(self_us)
+        modules.append((name, int(cumulative_us)))
+        if depth == 0:
+            total_us += int(cumulative_us)
+
+    return {
+        "module": module,
+        "total_ms": round(total_us / 1000, 1),
+        "packages": [(name, round(us / 1000, 1)) for name, us in
+                     sorted(packages.items(), key=lambda item: -item[1])[:top]],
+        "slowest": [(name, round(us / 1000, 1)) for name, us in
+                    sorted(modules, key=lambda item: -item[1])[:top]]
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Agrégation des traces de reruns et profil des imports")
+    parser.add_argument("path", nargs="?", default=str(TRACE_PATH), help="fichier de traces")
+    parser.add_argument("--imports", metavar="MODULE", nargs="?", const="main",
+                        help="profil des imports à froid d'un module (main par défaut)")
+    args = parser.parse_args(argv)
+
+    if args.imports:
+        report = import_profile(args.imports)
+        print(f"import {report['module']} : {report['total_ms']:.1f} ms")
+        print(f"{'paquet':<28} {'propre (ms)':>12}")
+        for name, ms in report["packages"]:
+            print(f"{name:<28} {ms:>12.1f}")
+        print(f"{'module':<40} {'cumulé (ms)':>12}")
+        for name, ms in report["slowest"]:
+            print(f"{name:<40} {ms:>12.1f}")
+        return
+
+    path = args.path
+    stats = aggregate(path)
+    if not stats:
+        print(f"Aucune trace dans {path}")
+        return
+    print(f"{'étape':<20} {'n':>7} {'p50 (ms)':>10} {'p95 (ms)':>10}")
+    for stage, values in sorted(stats.items(), key=lambda item: -item[1]["p50_ms"]):
+        print(f"{stage:<20} {values['count']:>7} {values['p50_ms']:>10.2f} {values['p95_ms']:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+"""Index inversé des recommandations et références de l'arbre décisionnel
+
+Usage :
+    python search_index.py "ciprofloxacine" [--guideline guidelines/infections_urinaires.json]
+
+Les champs `recommendation` et `references` de chaque feuille sont découpés en
+termes normalisés (minuscules, sans accents, doses collées à leur unité :
+« 500 mg » et « 500mg » donnent le même terme, « p. 28 » donne « p28 »). Chaque
+terme renvoie vers les feuilles qui le contiennent, avec leur chemin complet de
+réponses ; une requête est l'intersection des listes de ses termes.
+"""
+import argparse
+import re
+import threading
+import unicodedata
+from bisect import bisect_left
+from pathlib import Path
+
+from decision_engine import DecisionTable
+
+DEFAULT_GUIDELINE = Path(__file__).parent / "guidelines" / "infections_urinaires.json"
+
+# Unités de dose et leurs variantes écrites en toutes lettres
+UNITS = {
+    "mg": "mg", "milligramme": "mg", "milligrammes": "mg",
+    "g": "g", "gramme": "g", "grammes": "g",
+    "ml": "ml", "ui": "ui", "mui": "mui"
+}
+STOP_WORDS = frozenset(
+    ["a", "au", "aux", "d", "de", "des", "du", "en", "et", "l", "la", "le", "les", "ou", "par", "sur"])
+
+_DOSE = re.compile(r"(\d+(?:[.,]\d+)?)\s*(" + "|".join(
+    sorted(UNITS, key=len, reverse=True)) + r")\b")
+_PAGE = re.compile(r"\bp(?:age)?\.?\s*(\d+)\b")
+_TERM = re.compile(r"\d+(?:\.\d+)?[a-z]*|[a-z0-9]+")
+
+
+def normalize(text):
+    """Minuscules sans accents ni ligatures"""
+    text = unicodedata.normalize("NFKD", text.lower().replace("œ", "oe").replace("æ", "ae"))
+    return "".join(char for char in text if not unicodedata.combining(char))
+
+
+def tokenize(text):
+    """Termes normalisés d'un texte (doses et numéros de page regroupés)"""
+    text = normalize(text)
+    text = _DOSE.sub(lambda m: m.group(1).replace(",", ".") + UNITS[m.group(2)], text)
+    text = _PAGE.sub(r"p\1", text)
+    return [term for term in _TERM.findall(text) if term not in STOP_WORDS]
+
+
+class SearchIndex:
+    """Terme → feuilles (recommandation, références, chemin) de toutes les recommandations ajoutées"""
+
+    def __init__(self):
+        self.entries = []
+        self.postings = {}
+        self.terms = []
+
+    def add_guideline(self, guideline):
+        """Indexe chaque feuille d'une recommandation compilée"""
+        table = DecisionTable(guideline.tree)
+        for answers in sorted(table.leaves):
+            recommendation, references = table.leaves[answers]
+            path = []
+            for depth, answer in enumerate(answers):
+                key, question, _ = table.questions[answers[:depth]]
+                path.append({"key": key, "question": question, "answer": answer})
+            entry_id = len(self.entries)
+            self.entries.append({
+                "guideline": guideline.id,
+                "title": guideline.title,
+                "recommendation": recommendation,
+                "references": list(references),
+                "path": path
+            })
+            for term in set(tokenize(" ".join((recommendation,) + references))):
+                self.postings.setdefault(term, []).append(entry_id)
+        self.terms = sorted(self.postings)
+
+    def _matching(self, term, prefix):
+        if not prefix:
+            return set(self.postings.get(term, ()))
+        # Termes commençant par `term` : plage contiguë de la liste triée
+        matches = set()
+        for i in range(bisect_left(self.terms, term), len(self.terms)):
+            if not self.terms[i].startswith(term):
+                break
+            matches.update(self.postings[self.terms[i]])
+        return matches
+
+    def search(self, query, prefix=True, limit=None):
+        """Feuilles contenant tous les termes de la requête (préfixes acceptés par défaut)"""
+        terms = tokenize(query)
+        if not terms:
+            return []
+        # Termes les plus sélectifs d'abord : l'intersection se vide au plus tôt
+        found = None
+        for term in sorted(set(terms), key=len, reverse=True):
+            matches = self._matching(term, prefix)
+            found = matches if found is None else found & matches
+            if not found:
+                return []
+        return [self.entries[i] for i in sorted(found)[:limit]]
+
+
+# Index déjà construits dans ce processus, par ensemble de recommandations
+_indexes = {}
+_lock = threading.Lock()
+
+
+def get_index(guidelines):
+    """Index partagé des recommandations données, reconstruit seulement si l'une d'elles change"""
+    signature = tuple((guideline.id, guideline.source_hash) for guideline in guidelines)
+    with _lock:
+        index = _indexes.get(signature)
+        if index is None:
+            index = SearchIndex()
+            for guideline in guidelines:
+                index.add_guideline(guideline)
+            # Les index d'une version précédente de ces recommandations sont abandonnés
+            ids = tuple(guideline_id for guideline_id, _ in signature)
+            for known in [k for k in _indexes if tuple(i for i, _ in k) == ids]:
+                del _indexes[known]
+            _indexes[signature] = index
+        return index
+
+
+def main(argv=None):
+    from guidelines import load_guideline
+
+    parser = argparse.ArgumentParser(
+        description="Recherche dans les recommandations et références de l'arbre décisionnel")
+    parser.add_argument("query")
+    parser.add_argument("--guideline", action="append",
+                        help="fichier de recommandation (option répétable)")
+    parser.add_argument("--exact", action="store_true", help="désactive la recherche par préfixe")
+    args = parser.parse_args(argv)
+
+    guidelines = [load_guideline(path) for path in args.guideline or [DEFAULT_GUIDELINE]]
+    results = get_index(guidelines).search(args.query, prefix=not args.exact)
+    for entry in results:
+        answers = " → ".join(step["answer"] for step in entry["path"])
+        print(f"[{entry['guideline']}] {answers}")
+        print(f"    {entry['recommendation']} ({', '.join(entry['references'])})")
+    print(f"{len(results)} résultat(s)")
+
+
+if __name__ == "__main__":
+    main()
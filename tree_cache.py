@@ -0,0 +1,121 @@
+"""Cache à deux niveaux (mises en page par situation, figures par chemin)
+
+Les vues réduites des grands arbres (collapse_tree) sont mises en cache à part,
+par chemin et branches dépliées : elles servent à la figure et à la liste des
+branches dépliables.
+
+Ce module est importé une seule fois par processus : contrairement à main.py,
+réexécuté à chaque rerun Streamlit, ses caches sont partagés entre les sessions.
+"""
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+
+
+class LRUCache:
+    """Cache LRU borné, thread-safe, avec compteurs de succès et d'échecs"""
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_or_create(self, key, factory):
+        """Retourne la valeur associée à key, calculée par factory() en cas d'échec"""
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+            self.misses += 1
+
+        # Calcul hors verrou : deux sessions peuvent calculer la même valeur,
+        # la seconde écrase simplement la première
+        value = factory()
+
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def stats(self):
+        """Compteurs du cache sous forme de dictionnaire"""
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "size": len(self._entries),
+            "maxsize": self.maxsize,
+            "hit_rate": self.hits / total if total else 0.0
+        }
+
+
+def content_hash(node):
+    """Empreinte du contenu d'un (sous-)arbre : change dès que l'arbre change"""
+    payload = json.dumps(node, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+
+def path_key(user_path):
+    """Clé hachable représentant un chemin utilisateur"""
+    return tuple((step.get("option_index"), step["answer"]) for step in user_path or ())
+
+
+# Caches partagés par toutes les sessions du processus
+layout_cache = LRUCache(maxsize=32)
+figure_cache = LRUCache(maxsize=256)
+view_cache = LRUCache(maxsize=64)
+
+
+def get_layout(clinical_situation, subtree, builder):
+    """Mise en page compilée du sous-arbre, invalidée par l'empreinte de son contenu"""
+    key = (clinical_situation, content_hash(subtree))
+    return layout_cache.get_or_create(key, lambda: builder(subtree))
+
+
+def get_figure(clinical_situation, subtree, user_path, layout_builder, figure_builder,
+               tree_hash=None, variant=()):
+    """Figure du sous-arbre pour un chemin donné
+
+    layout_builder(subtree) produit la mise en page (premier niveau de cache),
+    figure_builder(layout, user_path) la figure (second niveau). tree_hash évite
+    de recalculer l'empreinte quand elle est déjà connue (arbre précompilé) ;
+    variant (hachable) distingue les figures d'un même chemin (branches dépliées).
+    """
+    if tree_hash is None:
+        tree_hash = content_hash(subtree)
+    key = (clinical_situation, tree_hash, path_key(user_path), variant)
+
+    def build():
+        layout = layout_cache.get_or_create(
+            (clinical_situation, tree_hash), lambda: layout_builder(subtree))
+        return figure_builder(layout, user_path)
+
+    return figure_cache.get_or_create(key, build)
+
+
+def get_view(clinical_situation, tree_hash, user_path, expanded, builder):
+    """Vue réduite du sous-arbre pour un chemin et des branches dépliées, construite par builder()"""
+    key = (clinical_situation, tree_hash, path_key(user_path), tuple(expanded))
+    return view_cache.get_or_create(key, builder)
+
+
+def cache_stats():
+    """Compteurs des caches (mises en page, figures, vues réduites)"""
+    return {"layouts": layout_cache.stats(), "figures": figure_cache.stats(),
+            "views": view_cache.stats()}
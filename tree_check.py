@@ -0,0 +1,257 @@
+"""Vérification de cohérence d'un arbre décisionnel et débit de rendu sur tous ses chemins
+
+Usage :
+    python tree_check.py [guidelines/infections_urinaires.json] [--json]
+    python tree_check.py --synthetic 8x5
+    python tree_check.py [fichier] --render [--limit 1000] [--serialize]
+
+La vérification parcourt l'arbre une seule fois (walk_tree) : temps linéaire en
+nombre de nœuds et mémoire en O(profondeur + clés distinctes), même pour des
+millions de chemins. Le code de sortie vaut 1 si une erreur est trouvée.
+"""
+import argparse
+import itertools
+import json
+import statistics
+import sys
+import time
+from pathlib import Path
+
+from decision_engine import iter_leaf_paths, walk_tree
+
+DEFAULT_GUIDELINE = Path(__file__).parent / "guidelines" / "infections_urinaires.json"
+
+ERROR = "erreur"
+WARNING = "avertissement"
+
+
+def check_tree(decision_tree, max_issues=1000):
+    """Vérifie l'arbre et retourne un rapport (compteurs et anomalies)
+
+    Anomalies détectées : nœud ou option mal formés (dont clé ou valeur non
+    textuelle), branche morte (question sans option), option sans issue ou avec
+    deux issues, valeurs d'options dupliquées sous une même question (seule la
+    première est atteignable par sa valeur, la recherche par libellé du chemin
+    devient ambiguë), clé répétée sur un même chemin (un cas ne peut y répondre
+    qu'une fois), clé réutilisée ailleurs pour une autre question ou d'autres
+    options, et cycle.
+    """
+    report = {"questions": 0, "options": 0, "paths": 0, "max_depth": 0,
+              "errors": 0, "warnings": 0, "issues": [], "truncated": 0}
+
+    def issue(level, code, path, message):
+        report["errors" if level == ERROR else "warnings"] += 1
+        if len(report["issues"]) >= max_issues:
+            report["truncated"] += 1
+            return
+        report["issues"].append({
+            "level": level,
+            "code": code,
+            "where": " > ".join(str(step["answer"]) for step in path) or "racine",
+            "message": message
+        })
+
+    # Clés des questions ancêtres du nœud courant, et leur nombre d'occurrences
+    stack_keys = []
+    on_path = {}
+    # Première définition de chaque clé : (question, valeurs des options)
+    definitions = {}
+
+    for kind, item, path in walk_tree(decision_tree):
+        if kind == "question":
+            report["questions"] += 1
+            depth = len(path)
+            while len(stack_keys) > depth:
+                key = stack_keys.pop()
+                on_path[key] -= 1
+            if not isinstance(item, dict):
+                issue(ERROR, "noeud_invalide", path, "un nœud doit être un objet")
+                stack_keys.append(None)
+                on_path[None] = on_path.get(None, 0) + 1
+                continue
+
+            key = item.get("key")
+            if key is not None and not isinstance(key, str):
+                issue(ERROR, "cle_invalide", path,
+                      f"champ 'key' non textuel ({type(key).__name__})")
+                key = None  # ni suivie sur le chemin ni comparée aux autres définitions
+            elif not key:
+                issue(ERROR, "cle_manquante", path, "champ 'key' manquant ou vide")
+            if not isinstance(item.get("question"), str) or not item.get("question"):
+                issue(ERROR, "question_manquante", path, "champ 'question' manquant ou vide")
+
+            options = item.get("options")
+            if not isinstance(options, list) or not options:
+                issue(ERROR, "branche_morte", path,
+                      f"la question '{key}' n'a aucune option : aucun chemin n'en sort")
+                options = []
+
+            # Valeurs non textuelles signalées avec leur option (valeur_invalide)
+            values = [option.get("value") for option in options
+                      if isinstance(option, dict) and isinstance(option.get("value"), str)]
+            seen = set()
+            for value in values:
+                if value in seen:
+                    issue(ERROR, "valeur_dupliquee", path,
+                          f"option '{value}' présente plusieurs fois sous '{key}' : "
+                          "seule la première est atteignable, le chemin est ambigu")
+                seen.add(value)
+
+            if isinstance(key, str):
+                if on_path.get(key):
+                    issue(ERROR, "cle_repetee_sur_chemin", path,
+                          f"la clé '{key}' apparaît deux fois sur ce chemin")
+                known = definitions.setdefault(key, (item.get("question"), tuple(values)))
+                if known != (item.get("question"), tuple(values)):
+                    issue(WARNING, "cle_dupliquee", path,
+                          f"la clé '{key}' est réutilisée pour une autre question ou d'autres options")
+            stack_keys.append(key)
+            on_path[key] = on_path.get(key, 0) + 1
+            report["max_depth"] = max(report["max_depth"], depth + 1)
+
+        elif kind == "option":
+            report["options"] += 1
+            if not isinstance(item, dict) or item.get("value") is None:
+                issue(ERROR, "valeur_manquante", path[:-1], "option sans 'value'")
+                continue
+            if not isinstance(item["value"], str):
+                issue(ERROR, "valeur_invalide", path[:-1],
+                      f"'value' non textuelle ({type(item['value']).__name__})")
+                continue
+            has_next = "next" in item
+            has_recommendation = "recommendation" in item
+            if has_next and has_recommendation:
+                issue(ERROR, "option_double_issue", path,
+                      "l'option a à la fois 'next' et 'recommendation'")
+            elif not has_next and not has_recommendation:
+                issue(ERROR, "option_sans_issue", path,
+                      "l'option n'a ni 'next' ni 'recommendation'")
+            elif has_recommendation:
+                report["paths"] += 1
+                if not isinstance(item["recommendation"], str) or not item["recommendation"].strip():
+                    issue(ERROR, "recommandation_vide", path, "recommandation vide ou non textuelle")
+                references = item.get("references", [])
+                if not isinstance(references, list) or not all(
+                        isinstance(ref, str) for ref in references):
+                    issue(ERROR, "references_invalides", path,
+                          "'references' doit être une liste de textes")
+                elif not references:
+                    issue(WARNING, "sans_reference", path, "recommandation sans référence")
+
+        elif kind == "cycle":
+            issue(ERROR, "cycle", path, "'next' renvoie vers un nœud ancêtre")
+
+    return report
+
+
+def guideline_render_cases(guideline):
+    """(mise en page, chemin filtré) de chaque chemin d'une recommandation compilée"""
+    from tree_layout import filter_path_for_tree
+
+    for path in iter_leaf_paths(guideline.tree):
+        situation = path[0]["answer"]
+        yield guideline.situations[situation].layout, filter_path_for_tree(path, situation)
+
+
+def tree_render_cases(decision_tree):
+    """(mise en page, chemin) de chaque chemin d'un arbre rendu en entier"""
+    from tree_layout import compile_tree
+
+    layout = compile_tree(decision_tree)
+    for path in iter_leaf_paths(decision_tree):
+        yield layout, path
+
+
+def render_throughput(cases, limit=None, serialize=False):
+    """Débit de create_decision_tree_visualization sur une suite de (mise en page, chemin)"""
+    from tree_visualization import create_decision_tree_visualization
+
+    cases = iter(cases)
+    first = next(cases, None)
+    if first is None:
+        return {"paths": 0}
+    # Rendu d'échauffement non mesuré (chargement paresseux des validateurs Plotly)
+    create_decision_tree_visualization(*first)
+
+    timings = []
+    started = time.perf_counter()
+    for layout, path in itertools.chain([first], cases):
+        if limit is not None and len(timings) >= limit:
+            break
+        start = time.perf_counter()
+        fig = create_decision_tree_visualization(layout, path)
+        if serialize:
+            fig.to_json()
+        timings.append((time.perf_counter() - start) * 1000)
+    elapsed = time.perf_counter() - started
+    ordered = sorted(timings)
+    return {
+        "paths": len(timings),
+        "seconds": round(elapsed, 3),
+        "paths_per_second": round(len(timings) / elapsed, 1) if elapsed else None,
+        "p50_ms": round(statistics.median(timings), 3),
+        "p95_ms": round(ordered[min(len(ordered) - 1, int(0.95 * len(ordered)))], 3)
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Vérifie la cohérence d'un arbre décisionnel (et mesure le débit de rendu)")
+    parser.add_argument("guideline", nargs="?", default=str(DEFAULT_GUIDELINE),
+                        help="fichier de recommandation (JSON/YAML)")
+    parser.add_argument("--synthetic", metavar="PxA",
+                        help="arbre synthétique profondeur x arité au lieu d'un fichier")
+    parser.add_argument("--render", action="store_true",
+                        help="rend la figure de chaque chemin et mesure le débit")
+    parser.add_argument("--limit", type=int, help="nombre maximal de chemins rendus")
+    parser.add_argument("--serialize", action="store_true",
+                        help="inclut la sérialisation JSON de chaque figure")
+    parser.add_argument("--json", action="store_true", help="rapport au format JSON")
+    args = parser.parse_args(argv)
+
+    if args.synthetic:
+        from benchmarks.synthetic import make_synthetic_tree
+
+        depth, fanout = (int(part) for part in args.synthetic.lower().split("x"))
+        decision_tree = make_synthetic_tree(depth, fanout)
+    else:
+        from guidelines import read_document
+
+        path = Path(args.guideline)
+        decision_tree = read_document(path.read_bytes(), path.suffix.lower())["tree"]
+
+    start = time.perf_counter()
+    report = check_tree(decision_tree)
+    report["check_ms"] = round((time.perf_counter() - start) * 1000, 3)
+
+    if args.render and not report["errors"]:
+        if args.synthetic:
+            cases = tree_render_cases(decision_tree)
+        else:
+            from guidelines import load_guideline
+
+            cases = guideline_render_cases(load_guideline(args.guideline))
+        report["render"] = render_throughput(cases, args.limit, args.serialize)
+
+    if args.json:
+        print(json.dumps(report, ensure_ascii=False, indent=2))
+    else:
+        for found in report["issues"]:
+            print(f"[{found['level']}] {found['code']} ({found['where']}) : {found['message']}")
+        if report["truncated"]:
+            print(f"... {report['truncated']} anomalies supplémentaires non affichées")
+        print(f"{report['questions']} questions, {report['options']} options, "
+              f"{report['paths']} chemins, profondeur {report['max_depth']} : "
+              f"{report['errors']} erreur(s), {report['warnings']} avertissement(s) "
+              f"en {report['check_ms']:.1f} ms")
+        if "render" in report:
+            render = report["render"]
+            if render["paths"]:
+                print(f"rendu : {render['paths']} chemins en {render['seconds']:.2f} s "
+                      f"({render['paths_per_second']} chemins/s, p50 {render['p50_ms']:.2f} ms, "
+                      f"p95 {render['p95_ms']:.2f} ms)")
+    return 1 if report["errors"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
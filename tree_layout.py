@@ -0,0 +1,457 @@
+"""Mise en page de l'arbre décisionnel (sans dépendance à Streamlit ni Plotly)"""
+from functools import lru_cache
+
+from compiled_tree import CompiledTree, NODE_TYPES, TYPE_CODES
+
+# Retour à la ligne des libellés par type de nœud : (caractères par ligne, lignes max)
+LABEL_WRAP = {
+    "question": (30, 3),
+    "option": (20, 2),
+    "recommendation": (20, 4),
+    "summary": (20, 2)
+}
+
+# Demi-largeur réservée à chaque type de nœud par la mise en page « tidy » :
+# deux nœuds voisins d'un même niveau sont écartés de la somme de leurs demi-largeurs
+NODE_HALF_WIDTH = {
+    "question": 2.5,
+    "option": 1.0,
+    "recommendation": 1.5,
+    "summary": 1.0
+}
+
+# Marge autour des bornes de l'arbre pour les axes de la figure
+LAYOUT_MARGIN = 3.0
+
+# Au-delà de ce nombre de nœuds, seuls le chemin et ses alternatives directes sont
+# dessinés, les sous-arbres hors chemin étant résumés (voir collapse_tree)
+LOD_THRESHOLD = 300
+
+# Titre des figures, suivi de celui de la recommandation affichée
+TREE_TITLE = "Arbre Décisionnel"
+
+
+def figure_title(title=None):
+    """Titre de la figure de l'arbre pour la recommandation de titre title"""
+    return f"{TREE_TITLE} - {title}" if title else TREE_TITLE
+
+
+def build_tree_structure(node, parent_id="root", node_id=0, tree_data=None, level=0, x_offset=0, branch_width=8):
+    """Construit la structure de l'arbre pour la visualisation avec espacement optimisé"""
+    if tree_data is None:
+        tree_data = {"nodes": [], "edges": []}
+
+    # Calculer le nombre total d'options pour cet embranchement
+    total_options = len(node["options"])
+
+    # Ajouter le nœud actuel (question)
+    current_node_id = f"node_{node_id}"
+    tree_data["nodes"].append({
+        "id": current_node_id,
+        "label": node["question"],
+        "type": "question",
+        "level": level,
+        "x": x_offset,
+        "y": -level * 3  # Espacement vertical plus important
+    })
+
+    # Si ce n'est pas le nœud racine, ajouter l'arête
+    if parent_id != "root":
+        tree_data["edges"].append({
+            "source": parent_id,
+            "target": current_node_id
+        })
+
+    child_node_id = node_id + 1
+
+    # Calculer l'espacement horizontal pour les options
+    option_spacing = branch_width / \
+        max(1, total_options - 1) if total_options > 1 else 0
+    start_x = x_offset - (branch_width / 2)
+
+    # Traiter chaque option
+    for i, option in enumerate(node["options"]):
+        option_x = start_x + \
+            (i * option_spacing) if total_options > 1 else x_offset
+        option_node_id = f"option_{child_node_id}"
+
+        # Ajouter le nœud d'option
+        tree_data["nodes"].append({
+            "id": option_node_id,
+            "label": option["value"],
+            "type": "option",
+            "level": level + 0.5,
+            "x": option_x,
+            "y": -(level + 0.5) * 3
+        })
+
+        # Arête du nœud question vers l'option
+        tree_data["edges"].append({
+            "source": current_node_id,
+            "target": option_node_id
+        })
+
+        child_node_id += 1
+
+        if "recommendation" in option:
+            # Nœud feuille (recommandation)
+            rec_node_id = f"rec_{child_node_id}"
+            # Raccourcir le texte de recommandation pour éviter les débordements
+            short_rec = option['recommendation'][:40] + "..." if len(
+                option['recommendation']) > 40 else option['recommendation']
+
+            tree_data["nodes"].append({
+                "id": rec_node_id,
+                "label": short_rec,
+                "type": "recommendation",
+                "level": level + 1.5,
+                "x": option_x,
+                "y": -(level + 1.5) * 3,
+                "full_recommendation": option['recommendation'],
+                "references": option.get('references', [])
+            })
+
+            tree_data["edges"].append({
+                "source": option_node_id,
+                "target": rec_node_id
+            })
+
+            child_node_id += 1
+
+        elif "next" in option:
+            # Nœud suivant - ajuster la largeur de branche pour les sous-arbres
+            # Réduire la largeur pour les niveaux inférieurs
+            sub_branch_width = branch_width * 0.6
+            child_node_id = build_tree_structure(
+                option["next"], option_node_id, child_node_id, tree_data,
+                level + 1.5, option_x, sub_branch_width
+            )
+
+    return child_node_id
+
+
+@lru_cache(maxsize=8192)
+def _wrap_label(text, max_chars_per_line, max_lines):
+    # Les lignes sont construites comme listes de mots avec une longueur courante,
+    # sans concaténations répétées
+    lines = []
+    current_words = []
+    current_length = 0
+
+    for word in text.split():
+        # Si ajouter ce mot dépasse la limite de caractères
+        if current_words and current_length + 1 + len(word) > max_chars_per_line:
+            lines.append(" ".join(current_words))
+            current_words = [word]
+            current_length = len(word)
+        else:
+            current_length += len(word) + (1 if current_words else 0)
+            current_words.append(word)
+
+    # Ajouter la dernière ligne
+    if current_words:
+        lines.append(" ".join(current_words))
+
+    # Limiter le nombre de lignes : la dernière ligne conservée se termine par "..."
+    if len(lines) > max_lines > 0:
+        last = lines[max_lines - 1]
+        if len(last) + 3 > max_chars_per_line:
+            last = last[:max(0, max_chars_per_line - 3)].rstrip()
+        lines = lines[:max_lines - 1] + [last + "..."]
+
+    return "<br>".join(lines)
+
+
+def format_text_with_linebreaks(text, max_chars_per_line=25, max_lines=3):
+    """Formate le texte avec des retours à la ligne pour améliorer la lisibilité
+
+    Le résultat est mémorisé par (texte, largeur, nombre de lignes) : un même
+    libellé n'est découpé qu'une fois par processus.
+    """
+    return _wrap_label(text, max_chars_per_line, max_lines)
+
+
+# Statistiques du cache de découpage (succès, échecs, taille) et vidage (benchmarks)
+wrap_cache_info = _wrap_label.cache_info
+wrap_cache_clear = _wrap_label.cache_clear
+
+
+def wrap_node_label(node):
+    """Libellé affiché d'un nœud, découpé selon les paramètres de son type"""
+    max_chars_per_line, max_lines = LABEL_WRAP[node["type"]]
+    return format_text_with_linebreaks(
+        node["label"], max_chars_per_line=max_chars_per_line, max_lines=max_lines)
+
+
+def tidy_layout(tree, half_width=NODE_HALF_WIDTH):
+    """Abscisses « tidy » de chaque nœud (Reingold–Tilford, variante linéaire de Buchheim–Walker)
+
+    Chaque sous-arbre est placé au plus près de ses frères gauches en suivant les
+    contours (fils) des sous-arbres déjà placés, et chaque parent est centré sur
+    ses enfants : aucun chevauchement, quelles que soient la profondeur et l'arité.
+    Parcours itératifs en O(n). Met à jour la colonne tree.x et retourne les
+    bornes (x_min, x_max, y_min, y_max) calculées pendant la même passe.
+    """
+    count = len(tree)
+    children = tree.children
+    parent = tree.parent
+    width = [half_width[NODE_TYPES[code]] for code in tree.kinds]
+    prelim = [0.0] * count
+    mod = [0.0] * count
+    shift = [0.0] * count
+    change = [0.0] * count
+    midpoint = [0.0] * count
+    thread = [-1] * count
+    ancestor = list(range(count))
+    number = [0] * count
+    for kids in children:
+        for k, child in enumerate(kids):
+            number[child] = k
+
+    def next_left(v):
+        return children[v][0] if children[v] else thread[v]
+
+    def next_right(v):
+        return children[v][-1] if children[v] else thread[v]
+
+    def move_subtree(wl, wr, amount):
+        subtrees = number[wr] - number[wl]
+        change[wr] -= amount / subtrees
+        shift[wr] += amount
+        change[wl] += amount / subtrees
+        prelim[wr] += amount
+        mod[wr] += amount
+
+    def apportion(v, left, default_ancestor):
+        # Rapproche le sous-arbre v de ses frères gauches en comparant les contours
+        vir = vor = v
+        vil = left
+        vol = children[parent[v]][0]
+        sir = sor = mod[v]
+        sil = mod[vil]
+        sol = mod[vol]
+        while next_right(vil) != -1 and next_left(vir) != -1:
+            vil = next_right(vil)
+            vir = next_left(vir)
+            vol = next_left(vol)
+            vor = next_right(vor)
+            ancestor[vor] = v
+            amount = (prelim[vil] + sil) - (prelim[vir] + sir) + width[vil] + width[vir]
+            if amount > 0:
+                wl = ancestor[vil] if parent[ancestor[vil]] == parent[v] else default_ancestor
+                move_subtree(wl, v, amount)
+                sir += amount
+                sor += amount
+            sil += mod[vil]
+            sir += mod[vir]
+            sol += mod[vol]
+            sor += mod[vor]
+        if next_right(vil) != -1 and next_right(vor) == -1:
+            thread[vor] = next_right(vil)
+            mod[vor] += sil - sor
+        if next_left(vir) != -1 and next_left(vol) == -1:
+            thread[vol] = next_left(vir)
+            mod[vol] += sir - sol
+            default_ancestor = v
+        return default_ancestor
+
+    # Ordre préfixe itératif ; son inverse traite chaque enfant avant son parent
+    preorder = []
+    stack = list(reversed(tree.roots()))
+    while stack:
+        v = stack.pop()
+        preorder.append(v)
+        stack.extend(reversed(children[v]))
+
+    for v in reversed(preorder):
+        kids = children[v]
+        if not kids:
+            continue
+        default_ancestor = kids[0]
+        for k, w in enumerate(kids):
+            if k == 0:
+                prelim[w] = midpoint[w]
+            else:
+                prelim[w] = prelim[kids[k - 1]] + width[kids[k - 1]] + width[w]
+                if children[w]:
+                    mod[w] = prelim[w] - midpoint[w]
+                default_ancestor = apportion(w, kids[k - 1], default_ancestor)
+        # Applique les décalages accumulés par move_subtree aux enfants
+        total_shift = total_change = 0.0
+        for w in reversed(kids):
+            prelim[w] += total_shift
+            mod[w] += total_shift
+            total_change += change[w]
+            total_shift += shift[w] + total_change
+        midpoint[v] = (prelim[kids[0]] + prelim[kids[-1]]) / 2
+
+    # Seconde passe : abscisses finales (racines côte à côte) et bornes
+    x_min = y_min = float("inf")
+    x_max = y_max = float("-inf")
+    offset = 0.0
+    for root in tree.roots():
+        prelim[root] = midpoint[root]
+        root_min = float("inf")
+        placed = []
+        stack = [(root, 0.0)]
+        while stack:
+            v, modsum = stack.pop()
+            x = prelim[v] + modsum
+            placed.append((v, x))
+            root_min = min(root_min, x)
+            for w in children[v]:
+                stack.append((w, modsum + mod[v]))
+        if offset:
+            delta = offset - root_min
+        else:
+            # Première racine centrée en x = 0
+            delta = -prelim[root]
+        xs, ys = tree.x, tree.y
+        for v, x in placed:
+            xs[v] = x + delta
+            x_min = min(x_min, xs[v])
+            x_max = max(x_max, xs[v])
+            y_min = min(y_min, ys[v])
+            y_max = max(y_max, ys[v])
+        offset = x_max + 2 * max(width)
+
+    if not count:
+        return (0.0, 0.0, 0.0, 0.0)
+    return (x_min, x_max, y_min, y_max)
+
+
+def node_bounds(nodes):
+    """Bornes (x_min, x_max, y_min, y_max) d'une liste de nœuds positionnés"""
+    if not nodes:
+        return (0.0, 0.0, 0.0, 0.0)
+    xs = [n["x"] for n in nodes]
+    ys = [n["y"] for n in nodes]
+    return (min(xs), max(xs), min(ys), max(ys))
+
+
+def compile_tree(node, branch_width=10, tidy=True):
+    """Construit la structure de l'arbre puis la compile (index, adjacence, libellés)
+
+    Avec tidy, les abscisses de build_tree_structure (largeur de branche fixe)
+    sont remplacées par la mise en page tidy_layout et les bornes de l'arbre
+    sont enregistrées dans tree.bounds.
+    """
+    tree_data = {"nodes": [], "edges": []}
+    build_tree_structure(node, tree_data=tree_data, branch_width=branch_width)
+    labels = [wrap_node_label(n) for n in tree_data["nodes"]]
+    tree = CompiledTree(tree_data, labels=labels)
+    if tidy:
+        tree.bounds = tidy_layout(tree)
+    return tree
+
+
+def collapse_tree(tree, path_ids, expanded=()):
+    """Vue réduite d'un arbre compilé pour les grands arbres (niveau de détail)
+
+    Restent visibles : les questions du chemin et leurs options, la recommandation
+    de chaque option visible, et le sous-arbre des options listées dans expanded
+    (identifiants d'options). Le sous-arbre de toute autre option est remplacé
+    par un nœud « summary » (identifiant summary_<option>) indiquant le nombre de
+    nœuds masqués. Retourne un nouvel arbre compilé, remis en page ; l'arbre
+    d'origine n'est pas modifié.
+    """
+    expanded = set(expanded)
+    # Lecture directe des colonnes (pas de vue par nœud) ; tailles des
+    # sous-arbres calculées une fois à la compilation
+    ids, kinds, children, size = tree.ids, tree.kinds, tree.children, tree.size
+    question, option = TYPE_CODES["question"], TYPE_CODES["option"]
+    recommendation = TYPE_CODES["recommendation"]
+    nodes, edges, labels = [], [], []
+
+    def show(v):
+        node = {"id": ids[v], "label": tree.texts[v], "type": NODE_TYPES[kinds[v]],
+                "level": tree.level[v], "x": tree.x[v], "y": tree.y[v], **tree.extras.get(v, {})}
+        nodes.append(node)
+        labels.append(tree.labels[v] if tree.labels else wrap_node_label(node))
+
+    stack = list(reversed(tree.roots()))
+    while stack:
+        v = stack.pop()
+        show(v)
+        for child in children[v]:
+            edges.append({"source": ids[v], "target": ids[child]})
+        if kinds[v] == question:
+            stack.extend(reversed(children[v]))
+        elif kinds[v] == option and children[v]:
+            child = children[v][0]
+            if (kinds[child] == recommendation or ids[v] in path_ids.nodes
+                    or ids[v] in expanded):
+                stack.append(child)
+            else:
+                # Sous-arbre replié : un seul nœud résumé à la place de la question suivante
+                edges[-1] = {"source": ids[v], "target": f"summary_{ids[v]}"}
+                summary = {
+                    "id": f"summary_{ids[v]}",
+                    "label": f"+{size[child]} nœuds",
+                    "type": "summary",
+                    "level": tree.level[child],
+                    "x": tree.x[child],
+                    "y": tree.y[child],
+                    "option": ids[v],
+                    "hidden": size[child]
+                }
+                nodes.append(summary)
+                labels.append(wrap_node_label(summary))
+
+    collapsed = CompiledTree({"nodes": nodes, "edges": edges}, labels=labels)
+    collapsed.bounds = tidy_layout(collapsed)
+    return collapsed
+
+
+def extract_clinical_situation_tree(decision_tree, clinical_situation):
+    """Extrait la partie de l'arbre correspondant à la situation clinique choisie"""
+
+    # Trouver l'option correspondant à la situation clinique
+    selected_option = None
+    for option in decision_tree["options"]:
+        if option["value"] == clinical_situation:
+            selected_option = option
+            break
+
+    if not selected_option:
+        return decision_tree  # Retourner l'arbre complet si non trouvé
+
+    # Si l'option a une recommandation directe, créer un arbre simple
+    if "recommendation" in selected_option:
+        return {
+            "question": f"Situation: {clinical_situation}",
+            "key": "situation",
+            "options": [selected_option]
+        }
+
+    # Si l'option a un sous-arbre, le retourner
+    elif "next" in selected_option:
+        return selected_option["next"]
+
+    return decision_tree
+
+
+def filter_path_for_tree(path, clinical_situation):
+    """Filtre le chemin pour ne garder que les étapes pertinentes pour l'arbre filtré"""
+    if not path:
+        return []
+
+    # Pour la colonisation, il n'y a qu'une étape (choix direct)
+    if clinical_situation == "colonisation":
+        return []  # Pas de sous-arbre à parcourir
+
+    # Pour les autres situations, enlever la première étape (choix de situation clinique)
+    # et garder les étapes suivantes qui correspondent au sous-arbre
+    filtered_path = []
+
+    # Commencer à partir de la deuxième étape (index 1)
+    for i in range(1, len(path)):
+        step = path[i]
+        filtered_path.append({
+            "question": step["question"],
+            "answer": step["answer"],
+            "option_index": step.get("option_index"),
+            "step": len(filtered_path) + 1
+        })
+
+    return filtered_path
@@ -0,0 +1,148 @@
+"""Rendu SVG de l'arbre décisionnel côté serveur (alternative légère à Plotly)
+
+Même interface que create_decision_tree_visualization, mais le résultat est un
+texte SVG autonome : le client n'a ni bundle Plotly à charger ni figure JSON à
+interpréter. Mêmes couleurs, tailles et mise en évidence du chemin ; le style
+est factorisé en classes CSS, préfixées par la classe du <svg> racine, et les
+arêtes tiennent dans deux <path>, d'où une charge de quelques kilo-octets.
+Rendu statique : ni zoom ni survol.
+"""
+from html import escape
+
+from compiled_tree import compile_tree_data, TYPE_CODES
+from tree_layout import (LAYOUT_MARGIN, LOD_THRESHOLD, collapse_tree, figure_title, node_bounds,
+                         wrap_node_label)
+
+LEGEND = "🟢 Chemin parcouru | 🔵 Questions | ⚫ Options | 🟠 Recommandations"
+
+# Marges de la figure Plotly (pixels) : gauche, droite, haut, bas
+MARGINS = (50, 50, 80, 50)
+
+# Classe de l'élément <svg> racine : chaque règle CSS lui est préfixée, la
+# feuille de style ne touche donc pas au reste de la page Streamlit
+ROOT_CLASS = "togoatb-tree"
+
+# Mêmes couleurs et tailles que tree_visualization (tailles de marqueurs = diamètres)
+RULES = (
+    ("text", "text-anchor:middle;dominant-baseline:central;fill:black"),
+    (".e", "fill:none;stroke:#CCCCCC;stroke-width:2"),
+    (".ep", "fill:none;stroke:#00AA00;stroke-width:5"),
+    (".q", "fill:#4472C4;stroke:darkgray;stroke-width:1"),
+    (".qp", "fill:#1E5091;stroke:#00AA00;stroke-width:3"),
+    (".r", "fill:#FF8C00;stroke:darkgray;stroke-width:1"),
+    (".rf", "fill:#FFD700;stroke:#00AA00;stroke-width:4"),
+    (".s", "fill:#E0E0E0;stroke:darkgray;stroke-width:1"),
+    (".tq,.to", "font-family:'Arial Black',Arial,sans-serif"),
+    (".tq", "font-size:11px"),
+    (".tqp", "font-size:13px"),
+    (".to", "font-size:12px"),
+    (".top", "font-size:15px;text-decoration:underline;"
+             "text-decoration-color:#00AA00;text-decoration-thickness:3px"),
+    (".tr", "font-size:8px"),
+    (".trf", "font-size:9px"),
+    (".ts", "font-size:10px"),
+)
+STYLE = "".join(
+    ",".join(f".{ROOT_CLASS} {selector}" for selector in selectors.split(",")) + f"{{{body}}}"
+    for selectors, body in RULES
+)
+QUESTION_SIZE = (95, 120)
+RECOMMENDATION_SIZE = (65, 85)
+SUMMARY_SIZE = 55
+
+
+def _number(value):
+    """Coordonnée arrondie au dixième de pixel, sans zéros inutiles"""
+    return format(round(value, 1), "g")
+
+
+def _text(x, y, label, css_class):
+    """Élément <text> multiligne centré sur (x, y), une ligne par <br> du libellé"""
+    lines = label.split("<br>")
+    parts = [f'<text class="{css_class}" x="{x}" y="{y}">']
+    if len(lines) == 1:
+        parts.append(escape(lines[0], quote=False))
+    else:
+        # Bloc de lignes centré verticalement (interligne 1.2em)
+        offset = -0.6 * (len(lines) - 1)
+        for k, line in enumerate(lines):
+            dy = f"{offset:g}em" if k == 0 else "1.2em"
+            parts.append(f'<tspan x="{x}" dy="{dy}">{escape(line, quote=False)}</tspan>')
+    parts.append("</text>")
+    return "".join(parts)
+
+
+def create_decision_tree_svg(tree_data, user_path=None, expanded=(), lod_threshold=LOD_THRESHOLD,
+                             title=None, view=None):
+    """Crée la visualisation de l'arbre décisionnel en SVG (texte)
+
+    Mêmes arguments que create_decision_tree_visualization : un arbre de plus de
+    lod_threshold nœuds est réduit par collapse_tree (options de expanded dépliées),
+    title (titre de la recommandation) est repris dans celui de la figure et
+    view (vue réduite déjà construite pour ce chemin) évite de la reconstruire.
+    """
+    tree = compile_tree_data(tree_data)
+    path_ids = tree.resolve_path(user_path)
+    if lod_threshold is not None and len(tree) > lod_threshold:
+        tree = view if view is not None else collapse_tree(tree, path_ids, expanded)
+    ids, kinds, xs, ys = tree.ids, tree.kinds, tree.x, tree.y
+    labels = tree.labels or [wrap_node_label(n) for n in tree.nodes]
+
+    # Mêmes axes et dimensions que la figure Plotly
+    x_min, x_max, y_min, y_max = tree.bounds or node_bounds(tree.nodes)
+    x_range = (min(-15, x_min - LAYOUT_MARGIN), max(15, x_max + LAYOUT_MARGIN))
+    y_range = (min(-20, y_min - LAYOUT_MARGIN), 2)
+    height = max(800, int(36 * (y_range[1] - y_range[0])))
+    width = max(1200, int(40 * (x_range[1] - x_range[0])))
+    left, right, top, bottom = MARGINS
+    scale_x = (width - left - right) / (x_range[1] - x_range[0])
+    scale_y = (height - top - bottom) / (y_range[1] - y_range[0])
+    px = [_number(left + (x - x_range[0]) * scale_x) for x in xs]
+    py = [_number(top + (y_range[1] - y) * scale_y) for y in ys]
+
+    heading = escape(figure_title(title))
+    parts = [
+        f'<svg xmlns="http://www.w3.org/2000/svg" class="{ROOT_CLASS}" viewBox="0 0 {width} {height}" '
+        f'width="100%" style="max-width:{width}px" font-family="Arial,sans-serif" '
+        f'role="img" aria-label="{heading}"><style>{STYLE}</style>',
+        f'<text x="{width / 2:g}" y="{top / 2:g}" style="font-size:18px">{heading}</text>'
+    ]
+
+    # Arêtes : un seul <path> hors chemin, un seul pour le chemin (tracé par-dessus)
+    off_path, on_path = [], []
+    for source, target in zip(tree.edge_source, tree.edge_target):
+        segments = on_path if (ids[source], ids[target]) in path_ids.edges else off_path
+        segments.append(f"M{px[source]} {py[source]}L{px[target]} {py[target]}")
+    for segments, css_class in ((off_path, "e"), (on_path, "ep")):
+        if segments:
+            parts.append(f'<path class="{css_class}" d="{"".join(segments)}"/>')
+
+    # Nœuds dans l'ordre des traces Plotly : questions, options, recommandations, résumés
+    question, option = TYPE_CODES["question"], TYPE_CODES["option"]
+    recommendation, summary = TYPE_CODES["recommendation"], TYPE_CODES["summary"]
+    # (codes de type dans cet ordre : un tri stable suffit)
+    for i in sorted(range(len(kinds)), key=kinds.__getitem__):
+        code, x, y = kinds[i], px[i], py[i]
+        if code == question:
+            on = ids[i] in path_ids.nodes
+            parts.append(f'<circle class="{"qp" if on else "q"}" cx="{x}" cy="{y}" '
+                         f'r="{QUESTION_SIZE[on] / 2:g}"/>')
+            parts.append(_text(x, y, labels[i], "tq tqp" if on else "tq"))
+        elif code == option:
+            on = ids[i] in path_ids.nodes
+            parts.append(_text(x, y, labels[i], "to top" if on else "to"))
+        elif code == recommendation:
+            final = ids[i] == path_ids.final
+            size = RECOMMENDATION_SIZE[final]
+            parts.append(f'<rect class="{"rf" if final else "r"}" '
+                         f'x="{_number(float(x) - size / 2)}" y="{_number(float(y) - size / 2)}" '
+                         f'width="{size}" height="{size}"/>')
+            parts.append(_text(x, y, labels[i], "tr trf" if final else "tr"))
+        else:
+            parts.append(f'<circle class="s" cx="{x}" cy="{y}" r="{SUMMARY_SIZE / 2:g}"/>')
+            parts.append(_text(x, y, labels[i], "ts"))
+
+    legend = LEGEND + (" | ⚪ Branches repliées" if summary in kinds else "")
+    parts.append(f'<text x="{width / 2:g}" y="{height - bottom / 2:g}" '
+                 f'style="font-size:14px">{escape(legend)}</text></svg>')
+    return "".join(parts)
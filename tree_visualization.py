@@ -0,0 +1,486 @@
+"""Visualisation Plotly de l'arbre décisionnel et mise en évidence du chemin"""
+import threading
+import weakref
+
+import numpy as np
+import plotly.graph_objects as go
+
+from compiled_tree import compile_tree_data, PathHighlight, TYPE_CODES
+from tree_layout import (LAYOUT_MARGIN, LOD_THRESHOLD, collapse_tree, figure_title, node_bounds,
+                         wrap_node_label)
+
+# Tables de style (hors chemin, sur le chemin), indexées par les masques du chemin
+QUESTION_STYLE = {
+    "text_size": np.array([11, 13]),
+    "size": np.array([95, 120]),
+    "color": np.array(["#4472C4", "#1E5091"], dtype=object),
+    "line_width": np.array([1, 3]),
+    "line_color": np.array(["darkgray", "#00AA00"], dtype=object)  # Vert pour le chemin
+}
+OPTION_STYLE = {
+    "text_size": np.array([12, 15]),
+    "webgl_size": np.array([6, 10]),
+    "webgl_color": np.array(["black", "#00AA00"], dtype=object)
+}
+RECOMMENDATION_STYLE = {
+    "text_size": np.array([8, 9]),
+    "size": np.array([65, 85]),
+    "color": np.array(["#FF8C00", "#FFD700"], dtype=object),
+    "line_width": np.array([1, 4]),
+    "line_color": np.array(["darkgray", "#00AA00"], dtype=object)  # Vert pour la finale
+}
+# (couleur, largeur) des arêtes hors chemin puis sur le chemin
+EDGE_STYLE = (("#CCCCCC", 2), ("#00AA00", 5))
+# Options du chemin : soulignement vert (balises HTML interprétées par Plotly)
+OPTION_UNDERLINE = ('<span style="text-decoration: underline; text-decoration-color: #00AA00; '
+                    'text-decoration-thickness: 3px;">{}</span>')
+
+# Au-delà de ce nombre de nœuds dessinés, les traces passent en WebGL (Scattergl) :
+# libellés en survol seulement, le rendu reste fluide quel que soit le nombre de points
+WEBGL_THRESHOLD = 1000
+
+
+def is_node_in_path(node, path_ids):
+    """Vérifie si un nœud (question ou option) appartient exactement au chemin utilisateur
+
+    path_ids est le PathHighlight précalculé par CompiledTree.resolve_path :
+    le test est une simple appartenance à un ensemble d'identifiants.
+    """
+    return bool(path_ids) and node["id"] in path_ids.nodes
+
+
+def is_final_recommendation(node, path_ids):
+    """Vérifie si ce nœud est LA recommandation finale unique correspondant au chemin complet"""
+    return bool(path_ids) and node["id"] == path_ids.final
+
+
+def path_masks(tree, path_ids):
+    """Masques booléens du chemin (nœuds, recommandation finale, arêtes)
+
+    Mêmes tests que is_node_in_path, is_final_recommendation et is_edge_in_path,
+    sans appel Python par nœud : les masques (O(N) à allouer, O(E) pour les
+    arêtes) sont remplis aux seules positions des identifiants du chemin. Une
+    arête est repérée par sa cible (parent unique).
+    """
+    count = len(tree)
+    in_path = np.zeros(count, dtype=bool)
+    is_final = np.zeros(count, dtype=bool)
+    edge_target_in_path = np.zeros(count, dtype=bool)
+    if path_ids:
+        index = tree.index
+        in_path[[index[node_id] for node_id in path_ids.node_order if node_id in index]] = True
+        if path_ids.final in index:
+            is_final[index[path_ids.final]] = True
+        edge_target_in_path[[index[target] for source, target in path_ids.edge_order
+                             if target in index and source in index
+                             and tree.parent[index[target]] == index[source]]] = True
+    edge_in_path = edge_target_in_path[np.frombuffer(tree.edge_target, dtype=np.intc)]
+    return in_path, is_final, edge_in_path
+
+
+def _style(table, mask):
+    """Valeur de style de chaque élément : table[0] hors chemin, table[1] sur le chemin"""
+    return table[mask.astype(np.intp)]
+
+
+def _segments(values, source, target):
+    """Coordonnées des segments source → cible séparés par une coupure (NaN → null en JSON)"""
+    segments = np.full(3 * len(source), np.nan)
+    segments[0::3] = values[source]
+    segments[1::3] = values[target]
+    return segments
+
+
+def create_decision_tree_visualization(tree_data, user_path=None, batch_edges=True,
+                                       expanded=(), lod_threshold=LOD_THRESHOLD,
+                                       webgl_threshold=WEBGL_THRESHOLD, title=None, view=None):
+    """Crée la visualisation de l'arbre décisionnel avec Plotly
+
+    Avec batch_edges, toutes les arêtes tiennent dans deux traces au lieu d'une
+    trace par arête (figure JSON plus légère, rendu navigateur plus rapide).
+    Un arbre de plus de lod_threshold nœuds est réduit par collapse_tree (les
+    options de expanded sont dépliées) ; si plus de webgl_threshold nœuds
+    restent à dessiner, les traces sont en WebGL. title est le titre de la
+    recommandation, repris dans celui de la figure. view est la vue réduite de
+    ce chemin si elle est déjà construite (cache partagé), réutilisée telle quelle.
+
+    Un arbre dessiné en entier ne dépend pas du chemin : sa figure neutre
+    (base_figure) est construite une fois par arbre compilé et partagée, et
+    seule une surcouche des éléments du chemin est construite à chaque appel
+    (path_overlay). Un arbre réduit par collapse_tree dépend du chemin : sa
+    figure est construite en entier.
+    """
+    tree = compile_tree_data(tree_data)
+
+    # Identifiants exacts du chemin
+    path_ids = tree.resolve_path(user_path)
+    collapsed = lod_threshold is not None and len(tree) > lod_threshold
+    if collapsed:
+        tree = view if view is not None else collapse_tree(tree, path_ids, expanded)
+    webgl = webgl_threshold is not None and len(tree) > webgl_threshold
+    if collapsed or not batch_edges:
+        return build_figure(tree, path_ids, batch_edges, webgl, title)
+    return path_overlay(tree, base_figure(tree, webgl, title), path_ids)
+
+
+def build_figure(tree, path_ids, batch_edges=True, webgl=False, title=None):
+    """Figure complète d'un arbre compilé, chemin compris
+
+    Le style est calculé en une passe : masques du chemin (path_masks), puis
+    chaque attribut par indexation des tables de style, en tableaux NumPy.
+    """
+    scatter = go.Scattergl if webgl else go.Scatter
+    in_path, is_final, edge_in_path = path_masks(tree, path_ids)
+    kinds = np.frombuffer(tree.kinds, dtype=np.uint8)
+    xs = np.frombuffer(tree.x, dtype=np.float64)
+    ys = np.frombuffer(tree.y, dtype=np.float64)
+    labels = np.array(tree.labels or [wrap_node_label(n) for n in tree.nodes], dtype=object)
+
+    # Séparer les nœuds par type pour un affichage différencié
+    question_idx = np.flatnonzero(kinds == TYPE_CODES["question"])
+    option_idx = np.flatnonzero(kinds == TYPE_CODES["option"])
+    recommendation_idx = np.flatnonzero(kinds == TYPE_CODES["recommendation"])
+    summary_idx = np.flatnonzero(kinds == TYPE_CODES["summary"])
+    question_on = in_path[question_idx]
+    option_on = in_path[option_idx]
+    recommendation_final = is_final[recommendation_idx]
+
+    # Trace pour les questions (avec disques bleus, texte noir, contour vert pour le chemin)
+    question_trace = scatter(
+        x=xs[question_idx],
+        y=ys[question_idx],
+        text=labels[question_idx],
+        mode='markers+text',
+        hoverinfo='text',
+        textposition="middle center",
+        textfont=dict(
+            size=_style(QUESTION_STYLE["text_size"], question_on),
+            color="black",  # Texte noir pour tous
+            family="Arial Black"
+        ),
+        marker=dict(
+            size=_style(QUESTION_STYLE["size"], question_on),
+            color=_style(QUESTION_STYLE["color"], question_on),
+            line=dict(
+                width=_style(QUESTION_STYLE["line_width"], question_on),
+                color=_style(QUESTION_STYLE["line_color"], question_on)
+            )
+        ),
+        name="Questions",
+        showlegend=False
+    )
+
+    # Trace pour les options (texte noir, souligné en vert si dans le chemin :
+    # seuls les libellés du chemin sont réécrits)
+    option_text = labels[option_idx]
+    for k in np.flatnonzero(option_on):
+        option_text[k] = OPTION_UNDERLINE.format(option_text[k])
+    option_trace = scatter(
+        x=xs[option_idx],
+        y=ys[option_idx],
+        text=option_text,
+        mode='text',
+        hoverinfo='text',
+        textposition="middle center",
+        textfont=dict(
+            size=_style(OPTION_STYLE["text_size"], option_on),
+            color="black",  # Texte noir pour tous
+            family="Arial Black"
+        ),
+        name="Options",
+        showlegend=False
+    )
+
+    # Trace pour les recommandations (texte noir, contour vert pour la finale)
+    recommendation_trace = scatter(
+        x=xs[recommendation_idx],
+        y=ys[recommendation_idx],
+        text=labels[recommendation_idx],
+        mode='markers+text',
+        hoverinfo='text',
+        textposition="middle center",
+        textfont=dict(
+            size=_style(RECOMMENDATION_STYLE["text_size"], recommendation_final),
+            color="black"  # Texte noir pour tous
+        ),
+        marker=dict(
+            size=_style(RECOMMENDATION_STYLE["size"], recommendation_final),
+            color=_style(RECOMMENDATION_STYLE["color"], recommendation_final),
+            line=dict(
+                width=_style(RECOMMENDATION_STYLE["line_width"], recommendation_final),
+                color=_style(RECOMMENDATION_STYLE["line_color"], recommendation_final)
+            ),
+            symbol="square"
+        ),
+        name="Recommandations",
+        showlegend=False
+    )
+
+    node_traces = [question_trace, option_trace, recommendation_trace]
+
+    # Sous-arbres repliés (grands arbres) : un disque gris par branche masquée
+    if len(summary_idx):
+        node_traces.append(scatter(
+            x=xs[summary_idx],
+            y=ys[summary_idx],
+            text=labels[summary_idx],
+            mode='markers+text',
+            hoverinfo='text',
+            textposition="middle center",
+            textfont=dict(size=10, color="black"),
+            marker=dict(size=55, color="#E0E0E0", line=dict(width=1, color="darkgray")),
+            name="Branches repliées",
+            showlegend=False
+        ))
+
+    if webgl:
+        # Le texte WebGL n'interprète pas le HTML des libellés : ils passent en survol
+        option_trace.update(mode='markers', marker=dict(
+            size=_style(OPTION_STYLE["webgl_size"], option_on),
+            color=_style(OPTION_STYLE["webgl_color"], option_on)))
+        for trace in node_traces:
+            trace.update(hovertext=trace.text, text=None, mode='markers')
+
+    # Créer les arêtes (vert pour le chemin choisi)
+    sources = np.frombuffer(tree.edge_source, dtype=np.intc)
+    targets = np.frombuffer(tree.edge_target, dtype=np.intc)
+    edge_trace = []
+    if batch_edges:
+        # Mode groupé : deux traces seulement (hors chemin puis chemin),
+        # segments séparés par une coupure
+        for mask, (edge_color, edge_width) in ((~edge_in_path, EDGE_STYLE[0]),
+                                               (edge_in_path, EDGE_STYLE[1])):
+            edge_trace.append(scatter(
+                x=_segments(xs, sources[mask], targets[mask]),
+                y=_segments(ys, sources[mask], targets[mask]),
+                mode='lines',
+                line=dict(width=edge_width, color=edge_color),
+                showlegend=False,
+                hoverinfo='none'
+            ))
+    else:
+        for source, target, on in zip(sources, targets, edge_in_path):
+            # Couleur de l'arête : vert si dans le chemin utilisateur
+            edge_color, edge_width = EDGE_STYLE[int(on)]
+            edge_trace.append(go.Scatter(
+                x=[xs[source], xs[target], None],
+                y=[ys[source], ys[target], None],
+                mode='lines',
+                line=dict(width=edge_width, color=edge_color),
+                showlegend=False,
+                hoverinfo='none'
+            ))
+
+    # Bornes des axes : au moins le cadre historique [-15, 15] x [-20, 2],
+    # élargi (avec la taille de la figure) quand l'arbre le dépasse
+    x_min, x_max, y_min, y_max = tree.bounds or node_bounds(tree.nodes)
+    x_range = [min(-15, x_min - LAYOUT_MARGIN), max(15, x_max + LAYOUT_MARGIN)]
+    y_range = [min(-20, y_min - LAYOUT_MARGIN), 2]
+
+    # Créer la figure avec des dimensions optimisées
+    fig = go.Figure(data=edge_trace + node_traces,
+                    layout=go.Layout(
+        title={
+            'text': figure_title(title),
+            'font': {'size': 18},
+            'x': 0.5
+        },
+        showlegend=False,
+        hovermode='closest',
+        margin=dict(b=50, l=50, r=50, t=80),
+        annotations=[
+            dict(
+                text="🟢 Chemin parcouru | 🔵 Questions | ⚫ Options | 🟠 Recommandations"
+                + (" | ⚪ Branches repliées" if len(summary_idx) else ""),
+                showarrow=False,
+                xref="paper", yref="paper",
+                x=0.5, y=-0.05,
+                xanchor="center", yanchor="top",
+                font=dict(size=14)
+            )
+        ],
+        xaxis=dict(
+            showgrid=False,
+            zeroline=False,
+            showticklabels=False,
+            range=x_range
+        ),
+        yaxis=dict(
+            showgrid=False,
+            zeroline=False,
+            showticklabels=False,
+            range=y_range
+        ),
+        plot_bgcolor='white',
+        height=max(800, int(36 * (y_range[1] - y_range[0]))),
+        width=max(1200, int(40 * (x_range[1] - x_range[0])))
+    ))
+
+    return fig
+
+
+class BaseFigure:
+    """Figure neutre d'un arbre compilé (aucun chemin), construite une fois et partagée
+
+    data et layout sont les dictionnaires Plotly de la figure : jamais modifiés,
+    ils sont repris tels quels par chaque figure de chemin. node_trace donne,
+    pour chaque nœud, l'indice de sa trace dans data, et rank sa position dans
+    cette trace.
+    """
+
+    __slots__ = ("webgl", "data", "layout", "node_trace", "rank")
+
+    def __init__(self, tree, webgl=False, title=None):
+        self.webgl = webgl
+        fig = build_figure(tree, PathHighlight(), webgl=webgl, title=title)
+        # Points « sélectionnés » (ceux du chemin, voir path_overlay) masqués :
+        # la surcouche les redessine sans que le libellé neutre transparaisse
+        for trace in fig.data[BASE_NODE_TRACES:]:
+            trace.update(selected=dict(marker=dict(opacity=0), textfont=dict(color=TRANSPARENT)),
+                         unselected=dict(marker=dict(opacity=1), textfont=dict(color="black")))
+        figure = fig.to_dict()
+        self.data = figure["data"]
+        self.layout = figure["layout"]
+
+        # Traces des nœuds dans l'ordre de build_figure : questions, options, recommandations
+        kinds = np.frombuffer(tree.kinds, dtype=np.uint8)
+        self.node_trace = np.full(len(kinds), -1)
+        self.rank = np.zeros(len(kinds), dtype=np.intp)
+        for offset, name in enumerate(("question", "option", "recommendation")):
+            positions = np.flatnonzero(kinds == TYPE_CODES[name])
+            self.node_trace[positions] = BASE_NODE_TRACES + offset
+            self.rank[positions] = np.arange(len(positions))
+
+
+# Traces d'arêtes en tête de la figure groupée (hors chemin, chemin), puis traces des nœuds
+BASE_NODE_TRACES = 2
+TRANSPARENT = "rgba(0,0,0,0)"
+
+# Figures neutres par arbre compilé (libérées avec l'arbre) : {arbre: {(webgl, titre): BaseFigure}}
+_base_figures = weakref.WeakKeyDictionary()
+_base_lock = threading.Lock()
+
+
+def base_figure(tree, webgl=False, title=None):
+    """Figure neutre de l'arbre, construite au premier appel puis partagée"""
+    with _base_lock:
+        cached = _base_figures.get(tree, {}).get((webgl, title))
+    if cached is None:
+        # Construction hors verrou : au pire deux constructions identiques
+        cached = BaseFigure(tree, webgl, title)
+        with _base_lock:
+            _base_figures.setdefault(tree, {})[(webgl, title)] = cached
+    return cached
+
+
+def path_overlay(tree, base, path_ids):
+    """Figure du chemin : figure neutre partagée plus une surcouche des seuls éléments du chemin
+
+    Les nœuds du chemin sont masqués dans les traces neutres (selectedpoints,
+    quelques indices) puis redessinés par-dessus avec le style du chemin. La
+    surcouche est calculée en O(P) directement depuis les identifiants du
+    chemin (tree.index), sans masque par nœud ; la figure neutre n'est ni
+    reconstruite ni revalidée, mais l'assemblage de la figure la copie (O(N))
+    et la figure envoyée au client contient la base entière plus la surcouche :
+    elle est un peu plus lourde que celle de build_figure (quelques Kio).
+    """
+    data = list(base.data)
+    if not path_ids:
+        return go.Figure({"data": data, "layout": base.layout}, _validate=False)
+
+    scatter = go.Scattergl if base.webgl else go.Scatter
+    index = tree.index
+    positions = {index[node_id] for node_id in path_ids.node_order if node_id in index}
+    final_idx = np.array([index[path_ids.final]] if path_ids.final in index else [],
+                         dtype=np.intp)
+    highlighted = np.array(sorted(positions.union(final_idx.tolist())), dtype=np.intp)
+    # Arêtes dans l'ordre du chemin : segments identiques d'un processus à l'autre
+    edges = [(index[source], index[target]) for source, target in path_ids.edge_order
+             if source in index and target in index
+             and tree.parent[index[target]] == index[source]]
+    traces = base.node_trace[highlighted]
+    for trace in np.unique(traces[traces >= 0]):
+        data[trace] = {**data[trace], "selectedpoints": base.rank[highlighted[traces == trace]]}
+
+    kinds = np.frombuffer(tree.kinds, dtype=np.uint8)
+    xs = np.frombuffer(tree.x, dtype=np.float64)
+    ys = np.frombuffer(tree.y, dtype=np.float64)
+    question_idx = highlighted[kinds[highlighted] == TYPE_CODES["question"]]
+    option_idx = highlighted[kinds[highlighted] == TYPE_CODES["option"]]
+
+    def label(i):
+        return tree.labels[i] if tree.labels else wrap_node_label(tree.nodes[i])
+
+    sources = np.array([source for source, _ in edges], dtype=np.intp)
+    targets = np.array([target for _, target in edges], dtype=np.intp)
+    edge_color, edge_width = EDGE_STYLE[1]
+    overlay = [
+        scatter(
+            x=_segments(xs, sources, targets),
+            y=_segments(ys, sources, targets),
+            mode='lines',
+            line=dict(width=edge_width, color=edge_color),
+            showlegend=False,
+            hoverinfo='none'
+        ),
+        scatter(
+            x=xs[question_idx],
+            y=ys[question_idx],
+            text=[label(i) for i in question_idx],
+            mode='markers+text',
+            hoverinfo='text',
+            textposition="middle center",
+            textfont=dict(size=QUESTION_STYLE["text_size"][1], color="black", family="Arial Black"),
+            marker=dict(
+                size=QUESTION_STYLE["size"][1],
+                color=QUESTION_STYLE["color"][1],
+                line=dict(width=QUESTION_STYLE["line_width"][1],
+                          color=QUESTION_STYLE["line_color"][1])
+            ),
+            name="Questions",
+            showlegend=False
+        ),
+        scatter(
+            x=xs[option_idx],
+            y=ys[option_idx],
+            text=[OPTION_UNDERLINE.format(label(i)) for i in option_idx],
+            mode='text',
+            hoverinfo='text',
+            textposition="middle center",
+            textfont=dict(size=OPTION_STYLE["text_size"][1], color="black", family="Arial Black"),
+            name="Options",
+            showlegend=False
+        ),
+        scatter(
+            x=xs[final_idx],
+            y=ys[final_idx],
+            text=[label(i) for i in final_idx],
+            mode='markers+text',
+            hoverinfo='text',
+            textposition="middle center",
+            textfont=dict(size=RECOMMENDATION_STYLE["text_size"][1], color="black"),
+            marker=dict(
+                size=RECOMMENDATION_STYLE["size"][1],
+                color=RECOMMENDATION_STYLE["color"][1],
+                line=dict(width=RECOMMENDATION_STYLE["line_width"][1],
+                          color=RECOMMENDATION_STYLE["line_color"][1]),
+                symbol="square"
+            ),
+            name="Recommandations",
+            showlegend=False
+        )
+    ]
+    if base.webgl:
+        # Mêmes conventions que build_figure en WebGL : libellés en survol
+        overlay[2].update(mode='markers', marker=dict(
+            size=OPTION_STYLE["webgl_size"][1], color=OPTION_STYLE["webgl_color"][1]))
+        for trace in overlay[1:]:
+            trace.update(hovertext=trace.text, text=None, mode='markers')
+
+    data.extend(trace.to_plotly_json() for trace in overlay)
+    return go.Figure({"data": data, "layout": base.layout}, _validate=False)
+
+
+def is_edge_in_path(edge, path_ids):
+    """Vérifie si une arête fait partie du chemin exact de l'utilisateur"""
+    return bool(path_ids) and (edge["source"], edge["target"]) in path_ids.edges